@@ -1,4 +1,5 @@
 import collections.abc
+from itertools import chain
 from typing import cast
 
 from .serializer import BaseSerializer, PickleSerializer
@@ -10,10 +11,10 @@ __all__ = ["Shelf", "open"]
 class _ClosedDict(collections.abc.MutableMapping):
     "Marker for a closed dict.  Access attempts raise a ValueError."
 
-    def closed(self, *args):
+    def closed(self, *args, **kwargs):
         raise ValueError("invalid operation on closed shelf")
 
-    __iter__ = __len__ = __getitem__ = __setitem__ = __delitem__ = keys = closed
+    __iter__ = __len__ = __getitem__ = __setitem__ = __delitem__ = keys = getmany = _store_many = closed
 
     def __repr__(self):
         return "<Closed Dictionary>"
@@ -28,49 +29,126 @@ class Shelf(collections.abc.MutableMapping):
         flag: str = "c",
         writeback: bool = False,
         serializer: BaseSerializer | None = None,
+        pragmas: dict | None = None,
+        compress_level: int = 3,
+        threaded: bool = False,
     ):
         sqlite3_kargs = {"autocommit": True, "check_same_thread": False}
         # 运行时 self.dict 在 close() 后会被替换为 _ClosedDict() 哨兵，
         # 对外正常操作都走 _Database；此处按 _Database 声明，close 里用
         # cast 做类型兜底，避免在每个调用点做无意义的类型收窄。
-        self.dict: sqlite._Database = sqlite.open(filename, flag, sqlite3_kargs=sqlite3_kargs)
+        self.dict: sqlite._Database = sqlite.open(
+            filename, flag, sqlite3_kargs=sqlite3_kargs, pragmas=pragmas, compress_level=compress_level
+        )
         self.writeback = writeback
+        # 批量落盘（sync / update）时是否把 zstd 压缩分摊到多个线程。
+        self._threads = -1 if threaded else 0
         self.cache: dict[str, object] = {}
+        # writeback 模式下 ``__setitem__`` 只写 cache，尚未落盘的 key 记在
+        # 这里；``len`` / ``iter`` 之前先把它们刷进 SQLite，保证 key 集合一致。
+        self._pending: set[str] = set()
         self.serializer: BaseSerializer = serializer or PickleSerializer()
         self._closed = False
 
     def __iter__(self):
+        self._flush_pending()
         return iter(self.dict.keys())
 
     def __len__(self):
+        self._flush_pending()
         return len(self.dict)
 
     def __contains__(self, key: object) -> bool:
-        return key in self.dict
+        return key in self.cache or key in self.dict
 
     def __getitem__(self, key: str):
+        # cache 只在 writeback 模式下才会有内容；非 writeback 时直接读库，
+        # 省掉每次必然 miss 的 ``cache[key]`` 抛出并捕获 KeyError 的开销。
+        if not self.writeback:
+            return self.serializer.unserialize(self.dict[key])
         try:
             return self.cache[key]
         except KeyError:
             pass
-        value = self.serializer.unserialize(self.dict[key])
-        if self.writeback:
-            self.cache[key] = value
+        value = self.cache[key] = self.serializer.unserialize(self.dict[key])
         return value
 
+    def get(self, key: str, default=None):
+        if self.writeback:
+            try:
+                return self[key]
+            except KeyError:
+                return default
+        raw = self.dict.get(key)
+        if raw is None:
+            return default
+        return self.serializer.unserialize(raw)
+
+    def getmany(self, keys) -> dict:
+        """Return ``{key: value}`` for every key in ``keys`` that exists.
+
+        Keys already in the writeback cache are served from it; the rest are
+        fetched from SQLite in batched ``IN (...)`` queries.
+        """
+        result = {}
+        missing = []
+        for key in keys:
+            if key in self.cache:
+                result[key] = self.cache[key]
+            else:
+                missing.append(key)
+        if missing:
+            unserialize = self.serializer.unserialize
+            for key, raw in self.dict.getmany(missing).items():
+                value = unserialize(raw)
+                if self.writeback:
+                    self.cache[key] = value
+                result[key] = value
+        return result
+
     def __setitem__(self, key: str, value):
         if self.writeback:
+            # 延迟写：cache 里的所有条目本来就会在 sync()/close() 时整体
+            # 回写，这里再单独 serialize + REPLACE 一次纯属重复劳动。
             self.cache[key] = value
+            self._pending.add(key)
+            return
         self.dict[key] = self.serializer.serialize(value)
 
     def __delitem__(self, key: str):
-        del self.dict[key]
+        pending = key in self._pending
+        self._pending.discard(key)
         self.cache.pop(key, None)
+        try:
+            del self.dict[key]
+        except KeyError:
+            # 只存在于 writeback cache、还没落盘的 key 也算删除成功。
+            if not pending:
+                raise
+
+    def update(self, other=(), /, **kwds):
+        """Store many items at once.
+
+        Without writeback every value is serialized and written through a
+        single ``executemany`` in one transaction; with writeback the items
+        just land in the cache and are flushed on :meth:`sync`.
+        """
+        if isinstance(other, collections.abc.Mapping):
+            other = other.items()
+        pairs = chain(other, kwds.items())
+        if self.writeback:
+            for key, value in pairs:
+                self.cache[key] = value
+                self._pending.add(key)
+            return
+        serialize = self.serializer.serialize
+        self.dict._store_many(((key, serialize(value)) for key, value in pairs), threads=self._threads)
 
     def clear(self):
         """Remove all items from the shelf."""
         # see https://github.com/python/cpython/issues/107089
         self.cache.clear()
+        self._pending.clear()
         self.dict.clear()
 
     def __enter__(self):
@@ -93,6 +171,7 @@ class Shelf(collections.abc.MutableMapping):
                 # Drop pending writeback so ``close()`` doesn't replay those
                 # writes after we just rolled the transaction back.
                 self.cache = {}
+                self._pending.clear()
                 self.dict.rollback()
         finally:
             self.close()
@@ -116,13 +195,19 @@ class Shelf(collections.abc.MutableMapping):
             return
         self.close()
 
+    def _flush_pending(self):
+        """Write keys that so far only live in the writeback cache."""
+        if self._pending:
+            serialize = self.serializer.serialize
+            self.dict._store_many(((key, serialize(self.cache[key])) for key in self._pending), threads=self._threads)
+            self._pending.clear()
+
     def sync(self):
         if self.writeback and self.cache:
-            self.writeback = False
-            for key, entry in self.cache.items():
-                self[key] = entry
-            self.writeback = True
+            serialize = self.serializer.serialize
+            self.dict._store_many(((key, serialize(entry)) for key, entry in self.cache.items()), threads=self._threads)
             self.cache = {}
+            self._pending.clear()
 
 
 def open(
@@ -130,6 +215,9 @@ def open(
     flag: str = "c",
     writeback: bool = False,
     serializer: BaseSerializer | None = None,
+    pragmas: dict | None = None,
+    compress_level: int = 3,
+    threaded: bool = False,
 ) -> Shelf:
     """Open a persistent dictionary backed by SQLite + zstd.
 
@@ -138,7 +226,24 @@ def open(
         flag: 'r' (read-only), 'w' (read/write existing), 'c' (create if
             missing, default), or 'n' (always create a new, empty db).
         writeback: Cache every read value so in-place mutations are
-            preserved and written back on ``sync()`` / ``close()``.
+            preserved and written back on ``sync()`` / ``close()``. Writes
+            are deferred to the cache as well and flushed in one batch.
         serializer: Value serializer. Defaults to :class:`PickleSerializer`.
+        pragmas: SQLite PRAGMAs overriding ``sqlite.DEFAULT_PRAGMAS``
+            (``mmap_size``, ``cache_size``, ``page_size``, ...); a value
+            of ``None`` skips that PRAGMA.
+        compress_level: zstd level for writes. The default of 3 favours
+            write throughput; higher levels trade speed for smaller files.
+        threaded: Compress batched writes (``update()``, writeback
+            ``sync()`` / ``close()``) on worker threads. Serialization
+            still runs on the calling thread.
     """
-    return Shelf(filename, flag, writeback, serializer=serializer)
+    return Shelf(
+        filename,
+        flag,
+        writeback,
+        serializer=serializer,
+        pragmas=pragmas,
+        compress_level=compress_level,
+        threaded=threaded,
+    )
@@ -2,18 +2,24 @@ import os
 import sqlite3
 import time
 import hashlib
+import inspect
 import pickle
+import queue
 import random
 import threading
+import types
+import warnings
 import weakref
+import zlib
 from pathlib import Path
 from contextlib import suppress, closing, contextmanager
 from functools import wraps
 from typing import Callable, Any, Optional, Union
 from collections import OrderedDict
 
-from .sqlite import _Database
+from .sqlite import _Database, RAW_VALUE_THRESHOLD
 from .serializer import BaseSerializer, PickleSerializer
+from .zstd import ZstdCompressor
 
 
 class SqlCacheError(Exception):
@@ -22,28 +28,61 @@ class SqlCacheError(Exception):
     pass
 
 
+# ``get`` 的未命中哨兵：缓存值本身可能是 None，不能拿 None 当 miss。
+_MISSING = object()
+
+
 class _LRUCache:
     """最小化的 LRU 实现，替代 ``cachetools.LRUCache``。
 
-    只提供热路径用到的 ``in`` / ``[]`` / ``clear`` / ``len`` 语义；底层直接
-    复用 ``OrderedDict`` 的 C 级实现，和 ``cachetools`` 性能基本一致，但免去
-    一个三方依赖。非线程安全——上层调用点本来也没有为内存缓存加锁。
+    只提供热路径用到的 ``in`` / ``[]`` / ``get`` / ``clear`` / ``len`` 语义；
+    底层直接复用 ``OrderedDict`` 的 C 级实现，淘汰是 O(1) 的 ``popitem``，
+    免去一个三方依赖。
+
+    线程安全：同一个装饰后的函数常被多个线程并发调用，``get`` 里的
+    "查找 + ``move_to_end``" 和 ``__setitem__`` 里的 "写入 + 淘汰" 都不是
+    原子的，交错执行会抛 ``KeyError``。公开方法统一在一把 ``Lock`` 下调用
+    不加锁的 ``_get`` / ``_set``，子类只覆盖后者，避免重复加锁。
     """
 
-    __slots__ = ("maxsize", "_data")
+    __slots__ = ("maxsize", "_data", "_lock")
 
     def __init__(self, maxsize: int):
         self.maxsize = maxsize
         self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
 
     def __contains__(self, key) -> bool:
-        return key in self._data
+        with self._lock:
+            return self._get(key, _MISSING) is not _MISSING
 
     def __getitem__(self, key):
-        self._data.move_to_end(key)
-        return self._data[key]
+        with self._lock:
+            value = self._get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        """单次探测：命中则标记为最近使用并返回值，否则返回 ``default``。
+
+        装饰器热路径用它代替 ``key in cache`` + ``cache[key]`` 两次查找。
+        """
+        with self._lock:
+            return self._get(key, default)
 
     def __setitem__(self, key, value) -> None:
+        with self._lock:
+            self._set(key, value)
+
+    def _get(self, key, default):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def _set(self, key, value) -> None:
         if key in self._data:
             self._data.move_to_end(key)
         self._data[key] = value
@@ -54,15 +93,16 @@ class _LRUCache:
         return len(self._data)
 
     def clear(self) -> None:
-        self._data.clear()
+        with self._lock:
+            self._data.clear()
 
 
 class _TTLCache(_LRUCache):
     """带绝对过期时间的 LRU，替代 ``cachetools.TTLCache``。
 
-    存储 ``(value, expire_at)`` 元组，``__contains__`` / ``__getitem__`` 做
-    惰性过期（过期即删并视为 miss），超过 ``maxsize`` 时按 LRU 淘汰最旧项。
-    采用 ``time.monotonic`` 避免系统时钟回拨影响过期判断。
+    存储 ``(value, expire_at)`` 元组，读取时做惰性过期（过期即删并视为
+    miss），超过 ``maxsize`` 时按 LRU 淘汰最旧项。采用 ``time.monotonic``
+    避免系统时钟回拨影响过期判断。
     """
 
     __slots__ = ("ttl",)
@@ -71,56 +111,496 @@ class _TTLCache(_LRUCache):
         super().__init__(maxsize)
         self.ttl = ttl
 
-    def __contains__(self, key) -> bool:
+    def _get(self, key, default):
         item = self._data.get(key)
         if item is None:
-            return False
+            return default
         if item[1] < time.monotonic():
             del self._data[key]
-            return False
+            return default
+        self._data.move_to_end(key)
+        return item[0]
+
+    def _set(self, key, value) -> None:
+        super()._set(key, (value, time.monotonic() + self.ttl))
+
+
+class _CountMinSketch:
+    """4 行 Count-Min Sketch，计数器封顶 15（4 bit 语义），存于 bytearray。
+
+    行下标用 ``hash(key)`` 的双重哈希 ``h1 + i * h2`` 派生，不必算 4 个独立
+    哈希。总增量达到 ``10 * width`` 时所有计数器减半（TinyLFU 的 reset），
+    让频率估计随时间衰减，过去的热点不会永远霸占缓存。
+    """
+
+    __slots__ = ("_table", "_mask", "_width", "_additions", "_sample_size")
+
+    _DEPTH = 4
+    _MAX_COUNT = 15
+
+    def __init__(self, capacity: int):
+        # 每行至少 1024 个计数器（4 行共 4 KB）：小缓存若按容量缩小宽度，
+        # 一次扫描带来的哈希碰撞就足以把冷键的估计值抬到热点之上。
+        width = 1024
+        while width < capacity:
+            width <<= 1
+        self._width = width
+        self._mask = width - 1
+        self._table = bytearray(self._DEPTH * width)
+        self._additions = 0
+        self._sample_size = 10 * width
+
+    def _indexes(self, key):
+        h = hash(key)
+        h2 = (h >> 16) | 1
+        mask, width = self._mask, self._width
+        return [row * width + ((h + row * h2) & mask) for row in range(self._DEPTH)]
+
+    def increment(self, key) -> None:
+        table = self._table
+        for i in self._indexes(key):
+            if table[i] < self._MAX_COUNT:
+                table[i] += 1
+        self._additions += 1
+        if self._additions >= self._sample_size:
+            self._table = bytearray(c >> 1 for c in table)
+            self._additions //= 2
+
+    def estimate(self, key) -> int:
+        table = self._table
+        return min(table[i] for i in self._indexes(key))
+
+
+class _BloomFilter:
+    """``cache`` 表键集合的 Bloom filter，用来在 ``get`` 里跳过必然 miss 的查询。
+
+    每个键约 10 bit、4 个哈希位（``hash(key)`` 双重哈希派生），误判率约
+    1%。只会误报"可能存在"，不会漏报，所以删除时不必维护，插入超过
+    ``capacity`` 后由调用方按表里现存的键重建。
+
+    不加锁：并发 ``add`` 的读-改-写最坏丢掉一个位，表现为一次多余的
+    miss（重新计算并写回），不影响正确性。
+    """
+
+    __slots__ = ("capacity", "_bits", "_mask", "_count")
+
+    _HASHES = 4
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        nbits = 8192
+        while nbits < capacity * 10:
+            nbits <<= 1
+        self._bits = bytearray(nbits >> 3)
+        self._mask = nbits - 1
+        self._count = 0
+
+    @property
+    def saturated(self) -> bool:
+        return self._count > self.capacity
+
+    def add(self, key) -> None:
+        h = hash(key)
+        h2 = (h >> 32) | 1
+        bits, mask = self._bits, self._mask
+        for i in range(self._HASHES):
+            bit = (h + i * h2) & mask
+            bits[bit >> 3] |= 1 << (bit & 7)
+        self._count += 1
+
+    def __contains__(self, key) -> bool:
+        h = hash(key)
+        h2 = (h >> 32) | 1
+        bits, mask = self._bits, self._mask
+        for i in range(self._HASHES):
+            bit = (h + i * h2) & mask
+            if not bits[bit >> 3] & (1 << (bit & 7)):
+                return False
         return True
 
-    def __getitem__(self, key):
-        value, expire_at = self._data[key]
-        if expire_at < time.monotonic():
-            del self._data[key]
-            raise KeyError(key)
-        self._data.move_to_end(key)
-        return value
 
-    def __setitem__(self, key, value) -> None:
-        super().__setitem__(key, (value, time.monotonic() + self.ttl))
+class _TinyLFUCache(_LRUCache):
+    """带 TinyLFU 准入的 LRU（``tinylfu=True`` 时使用）。
+
+    纯 LRU 下一次顺序扫描就能把热点全部挤出去。这里每次 ``get`` 都在
+    Count-Min Sketch 里给键记一次访问；缓存已满时，新键只有在估计频率
+    高于 LRU 端待淘汰项时才会被接纳，否则直接丢弃——反正值已经落到
+    SQLite 里，丢弃只意味着下次从磁盘层读取。
+    """
+
+    __slots__ = ("_sketch",)
+
+    def __init__(self, maxsize: int):
+        super().__init__(maxsize)
+        self._sketch = _CountMinSketch(maxsize)
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._sketch.increment(key)
+            return self._get(key, default)
+
+    def _set(self, key, value) -> None:
+        data = self._data
+        if key in data or len(data) < self.maxsize:
+            super()._set(key, value)
+            return
+        victim = next(iter(data))
+        if self._sketch.estimate(key) > self._sketch.estimate(victim):
+            del data[victim]
+            data[key] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._sketch = _CountMinSketch(self.maxsize)
 
 
 # 能直接用 ``repr`` 得到稳定、可哈希键的原生类型集合。把常见的标量类型
 # 都列出来，避免 ``_generate_key`` 掉到 ``pickle.dumps`` 慢路径。
 # ``bool`` 是 ``int`` 的子类，``type(True) is bool`` 所以独立列出不会误判。
-_FAST_KEY_TYPES: tuple[type, ...] = (int, str, bytes, float, bool, type(None))
+# 用 frozenset 做 O(1) 的哈希成员判断，而不是对 tuple 逐项比较。
+_FAST_KEY_TYPES: frozenset[type] = frozenset((int, str, bytes, float, bool, type(None)))
+
+
+def _now_ms() -> int:
+    """当前 Unix 时间，整数毫秒；``cache`` 表的时间列都用这个单位。"""
+    return time.time_ns() // 1_000_000
+
 
 # 采样率：命中时以此概率更新 ``last_access``。调高更贴近精确 LRU，调低
 # 更省写；1/8 是一个工程折衷，对 ``cleanup_lru`` 的近似误差已经很小。
 _ACCESS_UPDATE_SAMPLE_RATE = 0.125
 
+# 独占模式下内存里最多积攒多少个键的命中记录，超过就立即写回一次。
+_TOUCH_BUFFER_MAX = 4096
+
+# ``cleanup_lru`` 每个删除事务最多淘汰的行数。
+_CLEANUP_CHUNK_ROWS = 512
+
+# ``RETURNING`` 需要 SQLite >= 3.35；更老的库删除时拿不到被删行的计数。
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# ``cache`` 表上用到的全部 SQL。固定文本的模块级常量：每次调用不做字符串
+# 拼接，同样的文本也总能命中 sqlite3 连接内置的 prepared statement 缓存，
+# 不会被重新解析。
+_GET_SQL = "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)"
+_GET_TTL_SQL = _GET_SQL + " AND created_at > ?"
+_TOUCH_SQL = "UPDATE cache SET access_count = access_count + 1, last_access = ? WHERE key = ?"
+# 独占模式下积攒的命中批量写回：参数为 ``(命中次数, 最近命中时间, key)``。
+_TOUCH_BATCH_SQL = "UPDATE cache SET access_count = access_count + ?, last_access = max(last_access, ?) WHERE key = ?"
+_STORE_SQL = (
+    "INSERT OR REPLACE INTO cache (key, value, created_at, access_count, last_access, expires_at) VALUES (?, ?, ?, ?, ?, ?)"
+)
+_DELETE_SQL = "DELETE FROM cache WHERE key = ?"
+_DROP_SQL = "DROP TABLE IF EXISTS cache"
+_COUNT_SQL = "SELECT COUNT(*) FROM cache"
+_EXPIRE_SQL = "DELETE FROM cache WHERE expires_at < ?"
+_EXPIRE_TTL_SQL = "DELETE FROM cache WHERE expires_at < ? OR created_at < ?"
+_TRIM_LRU_SQL = "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access ASC LIMIT ?)"
+# 单条语句版本的分块 LRU 淘汰，供后台写线程使用：删掉超出 ``?2`` 的部分，
+# 每次最多 ``?1`` 行；``max(0, ...)`` 防止负数 LIMIT 被 SQLite 当成不限。
+_CLEANUP_LRU_SQL = (
+    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access ASC "
+    "LIMIT max(0, min(?1, (SELECT COUNT(*) FROM cache) - ?2)))"
+)
+_STATS_SQL = "SELECT COUNT(*), AVG(access_count), MAX(last_access) FROM cache"
+_ALL_KEYS_SQL = "SELECT key FROM cache"
+# 独占模式下维护增量统计用：先尝试插入新行，已存在时再原地更新，这样就能
+# 从 ``rowcount`` 知道行数有没有变化（``INSERT OR REPLACE`` 恒为 1）。
+_INSERT_NEW_SQL = _STORE_SQL.replace("INSERT OR REPLACE", "INSERT OR IGNORE")
+_REPLACE_EXISTING_SQL = (
+    "UPDATE cache SET value = ?2, created_at = ?3, access_count = ?4, last_access = ?5, expires_at = ?6 WHERE key = ?1"
+)
+_COUNT_SUM_SQL = "SELECT COUNT(*), SUM(access_count) FROM cache"
+_MAX_ACCESS_SQL = "SELECT MAX(last_access) FROM cache"
+_ALL_ROWS_SQL = "SELECT key, value FROM cache"
+_RECOMPRESS_SQL = "UPDATE cache SET value = ? WHERE key = ?"
+
+# Bloom filter 的最小容量（键数）；重建时取现存键数的两倍。
+_BLOOM_MIN_CAPACITY = 1024
+
+
+def _make_arg_normalizer(func: Callable) -> Optional[Callable]:
+    """为签名简单的函数构造 ``(args, kwargs) -> 位置参数元组`` 的规整函数。
+
+    装饰时从 ``__code__`` 读出形参名和默认值，调用时把关键字参数放回
+    各自的位置、补齐默认值，于是 ``f(1)``、``f(1, 10)``、``f(1, y=10)``
+    得到同一个键，而且键里不再有 kwargs——``_generate_key`` 省掉每次的
+    dict 排序。含 ``*args`` / ``**kwargs`` / 仅限关键字参数的函数、以及
+    普通函数以外的可调用对象返回 ``None``，走通用路径——绑定方法和
+    classmethod 会转发底层函数的 ``__code__``，但形参里多出的
+    ``self`` / ``cls`` 调用时并不由调用方传入。
+
+    规整函数遇到无法匹配的调用（未知关键字、缺参数、重复赋值）返回
+    ``None``，由调用方退回通用路径，让原函数自己抛出 ``TypeError``。
+    """
+    if type(func) is not types.FunctionType:
+        return None
+    code = func.__code__
+    if code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS) or code.co_kwonlyargcount:
+        return None
+
+    n = code.co_argcount
+    defaults = getattr(func, "__defaults__", None) or ()
+    first_default = n - len(defaults)
+    # 仅限位置参数不能用关键字传入，不放进映射表，这类调用会退回通用路径。
+    index = {name: i for i, name in enumerate(code.co_varnames[:n]) if i >= code.co_posonlyargcount}
+
+    def normalize(args: tuple, kwargs: dict) -> Optional[tuple]:
+        given = len(args)
+        if not kwargs:
+            if given == n:
+                return args
+            if first_default <= given < n:
+                return args + defaults[given - first_default :]
+            return None
+        if given > n:
+            return None
+        values = list(args)
+        values.extend([_MISSING] * (n - given))
+        for name, value in kwargs.items():
+            i = index.get(name)
+            if i is None or i < given:
+                return None
+            values[i] = value
+        for i in range(given, n):
+            if values[i] is _MISSING:
+                if i < first_default:
+                    return None
+                values[i] = defaults[i - first_default]
+        return tuple(values)
+
+    return normalize
+
+
+# 生成代码里内部名字的前缀；形参名以它开头的函数不走代码生成，免得冲突。
+_CODEGEN_PREFIX = "_sqlcache_"
+
+_FAST_WRAPPER_TEMPLATE = """\
+def _sqlcache_make({bindings}):
+    def wrapper({params}):
+        _sqlcache_k = _sqlcache_key(_sqlcache_name, ({args}), _sqlcache_nokw)
+        _sqlcache_v = _sqlcache_mget(_sqlcache_k, _sqlcache_missing)
+        if _sqlcache_v is not _sqlcache_missing:
+            return _sqlcache_v
+        _sqlcache_v = _sqlcache_dget(_sqlcache_k, _sqlcache_ttl)
+        if _sqlcache_v is not None:
+            _sqlcache_mset(_sqlcache_k, _sqlcache_v)
+            return _sqlcache_v
+        _sqlcache_v = _sqlcache_func({args})
+        _sqlcache_dset(_sqlcache_k, _sqlcache_v, _sqlcache_ttl)
+        _sqlcache_mset(_sqlcache_k, _sqlcache_v)
+        _sqlcache_cleanup(_sqlcache_k)
+        return _sqlcache_v
+    return wrapper
+"""
+
+
+def _make_fast_wrapper(func: Callable, /, **bindings) -> Optional[Callable]:
+    """按 ``func`` 的确切签名生成缓存 wrapper（思路同 ``dataclasses`` 生成 ``__init__``）。
+
+    通用 wrapper 每次调用都要打包 ``*args, **kwargs``、再经
+    :func:`_make_arg_normalizer` 规整；生成的 wrapper 形参和原函数一模一样，
+    关键字参数和默认值由解释器自己处理，直接用形参拼出键元组，和规整
+    路径得到的键完全相同。``bindings`` 作为工厂函数的参数传入，在
+    wrapper 里是闭包变量。
+
+    只处理 :func:`_make_arg_normalizer` 能处理的签名（只有普通位置 /
+    关键字参数的普通函数），其它情况返回 ``None``。
+    """
+    if type(func) is not types.FunctionType:
+        return None
+    code = func.__code__
+    n = code.co_argcount
+    names = code.co_varnames[:n]
+    if any(name.startswith(_CODEGEN_PREFIX) for name in names):
+        return None
+    defaults = func.__defaults__ or ()
+    first_default = n - len(defaults)
+
+    params = []
+    for i, name in enumerate(names):
+        params.append(name if i < first_default else f"{name}={_CODEGEN_PREFIX}d{i - first_default}")
+        if i + 1 == code.co_posonlyargcount:
+            params.append("/")
+    bindings = {f"{_CODEGEN_PREFIX}{k}": v for k, v in bindings.items()}
+    bindings.update((f"{_CODEGEN_PREFIX}d{i}", value) for i, value in enumerate(defaults))
+    # 单个参数的元组需要结尾逗号；零参数时 ``()`` 同样是合法的空元组。
+    args = "".join(f"{name}, " for name in names)
+
+    source = _FAST_WRAPPER_TEMPLATE.format(bindings=", ".join(bindings), params=", ".join(params), args=args)
+    namespace: dict = {}
+    exec(source, {}, namespace)
+    return namespace["_sqlcache_make"](**bindings)
+
+
+# 后台写线程攒批的时间窗口（秒）。
+_WRITE_BEHIND_WINDOW = 0.01
+
+
+class _WriteBehind:
+    """``write_behind=True`` 时的后台写线程。
+
+    ``set`` 只把整行放进 ``SimpleQueue`` 并记到 ``pending``（保证本进程
+    read-your-writes），由一个守护线程在 ~10 ms 的窗口里攒批，用一次
+    ``BEGIN IMMEDIATE`` + ``executemany`` + ``COMMIT`` 写入：N 次提交变
+    一次。清理语句同样排进队列，在每批行写完之后按去重执行，不会打断攒批；
+    分块的清理语句（``repeat=True``）之后每块单独一个事务，删到没有行为止。
+
+    线程只持有底层 ``_Database`` 和连接锁，不引用 ``_SqlCacheDatabase``，
+    对象仍可被 GC 并由 finalizer 收尾。锁冲突时重试一次，仍然失败就丢弃
+    这一批——对缓存而言等同于被淘汰——并发出 ``RuntimeWarning``。
+    """
+
+    _STOP = object()
+
+    def __init__(self, db: _Database, lock):
+        self._db = db
+        self._lock = lock
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending: dict = {}
+        self._pending_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="sqlcache-writer", daemon=True)
+        self._thread.start()
+
+    def lookup(self, key):
+        """返回尚未落盘的行，没有则 ``None``。"""
+        with self._pending_lock:
+            return self._pending.get(key)
+
+    def put_row(self, row: tuple) -> None:
+        if not self._thread.is_alive():
+            raise SqlCacheError("数据库连接已关闭")
+        with self._pending_lock:
+            self._pending[row[0]] = row
+        self._queue.put(row)
+
+    def put_statement(self, sql: str, params: tuple, repeat: bool = False) -> None:
+        self._queue.put((sql, params, repeat))
+
+    def flush(self) -> None:
+        """阻塞直到此前入队的写入全部提交。"""
+        if self._thread.is_alive():
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+
+    def _run(self) -> None:
+        q = self._queue
+        while True:
+            batch = [q.get()]
+            deadline = time.monotonic() + _WRITE_BEHIND_WINDOW
+            while type(batch[-1]) is tuple:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # 窗口结束前就遇到 flush / stop 标记时，先把已攒的写完再响应。
+            while type(batch[-1]) is tuple:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+
+            rows: dict = {}
+            statements: dict = {}
+            stop = False
+            events = []
+            for item in batch:
+                if item is self._STOP:
+                    stop = True
+                elif type(item) is threading.Event:
+                    events.append(item)
+                elif len(item) == 3:
+                    statements[item] = None
+                else:
+                    rows[item[0]] = item
+            if rows or statements:
+                self._write(list(rows.values()), list(statements))
+            with self._pending_lock:
+                for key, row in rows.items():
+                    if self._pending.get(key) is row:
+                        del self._pending[key]
+            for event in events:
+                event.set()
+            if stop:
+                return
+
+    def _write(self, rows: list, statements: list) -> None:
+        # 分块语句每次只删一块：还删到了行就再来一轮，每轮单独提交，
+        # 不会为了删完一大批而长时间占着写锁。
+        statements = self._commit(rows, statements)
+        while statements:
+            statements = self._commit([], statements)
+
+    def _commit(self, rows: list, statements: list) -> list:
+        """一个事务里写入 ``rows`` 并执行 ``statements``，返回还需再执行的分块语句。"""
+        for attempt in range(2):
+            with self._lock:
+                cx = self._db._cx
+                if cx is None:
+                    return []
+                try:
+                    again = []
+                    cx.execute("BEGIN IMMEDIATE")
+                    try:
+                        cx.executemany(_STORE_SQL, rows)
+                        for item in statements:
+                            if cx.execute(item[0], item[1]).rowcount > 0 and item[2]:
+                                again.append(item)
+                    except BaseException:
+                        cx.execute("ROLLBACK")
+                        raise
+                    cx.execute("COMMIT")
+                    return again
+                except sqlite3.Error as exc:
+                    message = str(exc).lower()
+                    if attempt == 0 and ("locked" in message or "busy" in message):
+                        continue
+                    warnings.warn(
+                        f"sqlcache 后台写入失败，丢弃 {len(rows)} 行、{len(statements)} 条清理语句: {exc}",
+                        RuntimeWarning,
+                    )
+                    return []
+        return []
+
 
 class _SqlCacheDatabase:
     """SQLite缓存数据库管理类"""
 
-    # ``key`` is a raw 16-byte BLAKE2b digest (not hex): halves the stored
+    # ``key`` is a raw 16-byte digest (not hex): halves the stored
     # size and skips the TEXT→BLOB comparison path in SQLite. Old caches
     # created with a TEXT column still work — SQLite stores BLOB values
     # regardless of declared affinity — but rows inserted before the
     # hex-digest → raw-digest switch will no longer be reachable (the
     # on-disk cache acts as if those entries were evicted, which is the
-    # correct failure mode for a cache).
-    BUILD_TABLE = """
-        CREATE TABLE IF NOT EXISTS cache (
+    # correct failure mode for a cache). The same applies to the later
+    # BLAKE2b → truncated SHA-256 switch.
+    #
+    # 时间列都是整数毫秒（Unix epoch）：SQLite 按变长整数存储，比 8 字节
+    # 的 REAL 更省空间，比较也是原生 int64。
+    COLUMNS = """
             key BLOB UNIQUE NOT NULL PRIMARY KEY,
             value BLOB NOT NULL,
-            created_at REAL NOT NULL,
+            created_at INTEGER NOT NULL,
             access_count INTEGER DEFAULT 0,
-            last_access REAL NOT NULL
-        )
+            last_access INTEGER NOT NULL,
+            expires_at INTEGER
     """
+    BUILD_TABLE = f"CREATE TABLE IF NOT EXISTS cache ({COLUMNS})"
+
+    # ``user_version`` 记录的表结构版本：
+    #   1 —— 新增 ``expires_at``（绝对过期时间，NULL 表示不过期）；
+    #   2 —— 时间列从 REAL 秒改为 INTEGER 毫秒。
+    SCHEMA_VERSION = 2
 
     CREATE_INDEX = """
         CREATE INDEX IF NOT EXISTS idx_created_at ON cache(created_at)
@@ -130,10 +610,54 @@ class _SqlCacheDatabase:
         CREATE INDEX IF NOT EXISTS idx_last_access ON cache(last_access)
     """
 
-    def __init__(self, cache_path: str, multiprocess_safe: bool = True):
+    CREATE_EXPIRES_INDEX = """
+        CREATE INDEX IF NOT EXISTS idx_expires_at ON cache(expires_at)
+    """
+
+    # 在 ``shelvez.sqlite.DEFAULT_PRAGMAS``（WAL、``synchronous=normal``、
+    # 内存临时表、256 MB mmap……）之上，多进程模式额外放宽的设置：写锁
+    # 等待更久；每个进程的页缓存收小一些，因为 N 个进程各持一份。
+    # 两种模式都追加的设置：``cache_spill=OFF`` 让事务里的脏页留在页缓存，
+    # 直到 COMMIT 才落盘，不会在事务中途提前溢写并升级为排它锁（后台写
+    # 线程的批量事务最受益）。
+    BASE_PRAGMAS = {"cache_spill": "OFF"}
+
+    MULTIPROCESS_PRAGMAS = {
+        "busy_timeout": 30000,  # 30秒超时
+        "cache_size": -20000,  # 20MB缓存
+    }
+
+    def __init__(
+        self,
+        cache_path: str,
+        multiprocess_safe: bool = True,
+        pragmas: Optional[dict] = None,
+        write_behind: bool = False,
+        exclusive: bool = False,
+    ):
+        """
+        Args:
+            cache_path: 缓存数据库文件路径
+            multiprocess_safe: 是否启用多进程安全模式
+            pragmas: 逐项覆盖连接 PRAGMA，值为 ``None`` 表示跳过该项。单进程
+                独占的缓存可以传 ``{"journal_mode": "memory"}`` 换取更少的
+                I/O，代价是进程崩溃时缓存文件可能损坏——因此默认两种模式
+                都用 WAL。
+            write_behind: ``set`` 改为放入后台线程批量提交（见
+                :class:`_WriteBehind`）。本进程内立即可读，其它进程要等到
+                下一批提交（~10 ms）或 :meth:`flush` 之后才能看到。
+            exclusive: 声明本对象是缓存文件唯一的使用者——没有别的进程，
+                本进程里也没有别的 ``SqlCache`` / ``_SqlCacheDatabase`` 打开
+                同一路径。只有这样内存里的键集合、行数和命中记录才可信，
+                因此 Bloom filter、增量统计和命中缓冲都只在此时启用。
+                与 ``multiprocess_safe=True`` 互斥。
+        """
+        if exclusive and multiprocess_safe:
+            raise ValueError("exclusive=True 需要同时指定 multiprocess_safe=False")
         self.cache_path = Path(cache_path)
         self.cache_path.parent.mkdir(parents=True, exist_ok=True)
         self.multiprocess_safe = multiprocess_safe
+        self.exclusive = exclusive
 
         # 使用 autocommit=True：否则 Python sqlite3 的隐式事务会把每次
         # ``set``/``delete`` 写入关在一个从未提交的事务里，导致：
@@ -141,57 +665,128 @@ class _SqlCacheDatabase:
         #   2) 第二个连接再写入时撞上第一个连接的写锁，触发 "database is locked"
         #      并让 busy_timeout 最多各阻塞 30s，单个用例耗时爆炸到分钟级。
         sqlite3_kargs = {"autocommit": True}
-        if multiprocess_safe:
+        if multiprocess_safe or write_behind:
             sqlite3_kargs["check_same_thread"] = False
 
-        # 使用现有的_Database类来管理SQLite连接
-        self._db = _Database(str(self.cache_path), flag="c", mode=0o666, sqlite3_kargs=sqlite3_kargs)
+        # PRAGMA 在 ``_Database`` 建连后、建表前统一设置，``page_size`` 对
+        # 新文件因此真正生效。
+        mode_pragmas = self.MULTIPROCESS_PRAGMAS if multiprocess_safe else {}
+        self._pragmas = {**self.BASE_PRAGMAS, **mode_pragmas, **(pragmas or {})}
+        self._sqlite3_kargs = sqlite3_kargs
+        self._write_behind = write_behind
 
         # 多线程共享同一 sqlite3 连接时必须外部加锁，否则游标生命周期
         # 会相互踩踏，引发 "bad parameter or other API misuse"。
         self._lock = threading.RLock()
 
-        # 为多进程环境优化PRAGMA设置
-        if multiprocess_safe:
-            self._optimize_for_multiprocess()
+        # 使用现有的序列化器
+        self.serializer = PickleSerializer()
+
+        self._open()
+
+        # 以下内存状态只在构造时建立一次，:meth:`_open` 重新连接时原样保留：
+        # 独占的文件在关闭期间不会被别人改动，它们仍然准确；而且 ``set`` /
+        # ``get`` 可能已经把这些对象取到局部变量里，不能中途替换。
+        exclusive = self.exclusive
+
+        # 只有本对象独占缓存文件（``exclusive=True``）时，内存里的键集合才
+        # 可信；否则别的进程或同路径的其它实例随时可能插入，不能据此判 miss。
+        self._bloom: Optional[_BloomFilter] = None
+        if exclusive:
+            self._rebuild_bloom()
+
+        # 独占且同步写入时，行数和 ``access_count`` 总和在内存里增量维护，
+        # ``get_stats`` 不用每次全表 ``COUNT(*)``。
+        # ``[行数, access_count 总和]``；总和为 ``None`` 表示暂时不可知（覆盖了
+        # 已有行、或者 SQLite 不支持 ``RETURNING``），下次 ``get_stats`` 重新统计。
+        self._counters: Optional[list] = None
+        if exclusive and not self._write_behind:
+            self._reseed_counters()
+
+        # 独占模式下命中不写库，只在内存里记 ``{key: [最近命中时间, 命中次数]}``，
+        # 在 ``cleanup_lru`` / ``get_stats`` / ``close`` 之前批量写回。
+        # 这样读多写少的负载对数据库是纯读的。非独占时别的使用者要据
+        # ``last_access`` 淘汰，仍然按采样即时写回。
+        self._touches: Optional[dict] = {} if exclusive else None
+
+    def _open(self):
+        """建立连接并初始化表结构。
+
+        构造时调用一次；:meth:`close` 之后再使用时由 :meth:`_exec_cursor`
+        再调用一次，透明地重新打开——之后的调用照常复用这一条连接，热路径
+        上不会有逐次 ``connect``。这里只恢复连接本身（表结构、写线程、
+        finalizer），不碰 Bloom filter / 计数 / 命中缓冲。
+        """
+        # 使用现有的_Database类来管理SQLite连接
+        self._db = _Database(
+            str(self.cache_path), flag="c", mode=0o666, sqlite3_kargs=self._sqlite3_kargs, pragmas=self._pragmas
+        )
 
         with self._execute(self.BUILD_TABLE):
             pass
+        self._migrate_schema()
         with self._execute(self.CREATE_INDEX):
             pass
         with self._execute(self.CREATE_ACCESS_INDEX):
             pass
+        with self._execute(self.CREATE_EXPIRES_INDEX):
+            pass
 
-        # 使用现有的序列化器
-        self.serializer = PickleSerializer()
+        self._writer = _WriteBehind(self._db, self._lock) if self._write_behind else None
 
         # 用 weakref.finalize 兜底，确保对象被 GC 时一定会关闭底层 sqlite3
         # 连接；对热路径零开销（仅在对象被回收时触发一次）。
-        self._finalizer = weakref.finalize(self, self._finalize_db, self._db)
+        self._finalizer = weakref.finalize(self, self._finalize_db, self._db, self._writer)
 
     @staticmethod
-    def _finalize_db(db) -> None:
+    def _finalize_db(db, writer=None) -> None:
         """Finalizer：不能引用 self，否则会阻止 GC。"""
         with suppress(Exception):
+            if writer is not None:
+                writer.close()
             db.close()
 
-    def _optimize_for_multiprocess(self):
-        """为多进程环境优化SQLite设置"""
-        cx = self._db._cx
-        if cx is None:
+    def _cache_columns(self) -> dict[str, str]:
+        """返回 ``cache`` 表的 ``{列名: 声明类型}``。"""
+        with self._execute("PRAGMA table_info(cache)") as cur:
+            return {row[1]: row[2].upper() for row in cur.fetchall()}
+
+    def _migrate_schema(self):
+        """把旧版本创建的 ``cache`` 表升级到 :attr:`SCHEMA_VERSION`。
+
+        按列的实际声明类型判断要做哪一步，而不是只看 ``user_version``：
+        刚由 :attr:`BUILD_TABLE` 建出的新表版本号也是 0，但无需迁移。整个
+        过程在 ``BEGIN IMMEDIATE`` 里完成，多个进程同时打开旧库时只有
+        第一个会真正迁移，其余的拿到写锁后发现已经是新结构。
+
+        旧行没有记录当时的 ttl，``expires_at`` 只能留 NULL；它们仍会被
+        ``get(ttl=...)`` / ``cleanup_expired(ttl)`` 按 ``created_at`` 过期。
+        """
+        if self._exec_fetchone("PRAGMA user_version")[0] >= self.SCHEMA_VERSION:
             return
-        try:
-            # 为多进程环境优化的PRAGMA设置
-            cx.execute("PRAGMA journal_mode = wal")  # WAL模式支持并发读取
-            cx.execute("PRAGMA synchronous = normal")  # 平衡性能和安全性
-            cx.execute("PRAGMA busy_timeout = 30000")  # 30秒超时
-            cx.execute("PRAGMA cache_size = -20000")  # 20MB缓存
-            cx.execute("PRAGMA temp_store = MEMORY")  # 临时表存储在内存
-            cx.execute("PRAGMA mmap_size = 268435456")  # 256MB内存映射
-            cx.execute("PRAGMA page_size = 4096")  # 4KB页面大小
-        except sqlite3.OperationalError:
-            # PRAGMA设置失败不影响功能，忽略错误
-            pass
+        with self._lock:
+            self._exec_no_result("BEGIN IMMEDIATE")
+            try:
+                columns = self._cache_columns()
+                if "expires_at" not in columns:
+                    self._exec_no_result("ALTER TABLE cache ADD COLUMN expires_at REAL")
+                    columns["expires_at"] = "REAL"
+                if columns["created_at"] != "INTEGER":
+                    # 改列类型只能重建表；索引随旧表删除，由 ``__init__`` 重建。
+                    self._exec_no_result(f"CREATE TABLE cache_migrating ({self.COLUMNS})")
+                    self._exec_no_result(
+                        "INSERT INTO cache_migrating SELECT key, value, CAST(created_at * 1000 AS INTEGER), "
+                        "access_count, CAST(last_access * 1000 AS INTEGER), CAST(expires_at * 1000 AS INTEGER) "
+                        "FROM cache"
+                    )
+                    self._exec_no_result("DROP TABLE cache")
+                    self._exec_no_result("ALTER TABLE cache_migrating RENAME TO cache")
+                self._exec_no_result(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+            except BaseException:
+                with suppress(SqlCacheError):
+                    self._exec_no_result("ROLLBACK")
+                raise
+            self._exec_no_result("COMMIT")
 
     @contextmanager
     def _execute(self, sql: str, params: tuple = ()):
@@ -204,47 +799,47 @@ class _SqlCacheDatabase:
         保留这个方法是因为外部测试 / 不在热路径上的 ``get_stats`` 仍以
         ``with db._execute(...) as cur:`` 的方式使用它。
         """
-        cursor = self._exec_with_retry(sql, params)
+        cursor = self._exec_cursor(sql, params)
         try:
             yield cursor
         finally:
             cursor.close()
 
-    def _exec_with_retry(self, sql: str, params: tuple):
-        """核心：拿锁 → ``cx.execute`` → 按需重试，返回未关闭的 cursor。
+    def _exec_cursor(self, sql: str, params: tuple):
+        """核心：拿锁 → ``cx.execute``，返回未关闭的 cursor。调用方负责 ``close``。
 
-        多进程安全模式下遇到 ``database is locked`` 做指数退避重试，其它
-        SQLite 错误统一转成 :class:`SqlCacheError`。调用方负责 ``close``。
+        锁等待完全交给 SQLite 的 ``busy_timeout``（多进程模式 30 s，否则
+        5 s，见 ``MULTIPROCESS_PRAGMAS`` / ``DEFAULT_PRAGMAS``）：C 层的
+        busy handler 在锁释放后立刻重试，不用在 Python 里 ``sleep`` 退避。
+        走到这里的 ``database is locked`` 说明已经等满了超时，不再重试；
+        它和其它 SQLite 错误统一转成 :class:`SqlCacheError`。
         """
-        max_retries = 5 if self.multiprocess_safe else 1
-
         with self._lock:
             cx = self._db._cx
             if cx is None:
-                raise SqlCacheError("数据库连接已关闭")
-            attempt = 0
-            while True:
-                try:
-                    return cx.execute(sql, params)
-                except sqlite3.OperationalError as exc:
-                    attempt += 1
-                    if self.multiprocess_safe and "database is locked" in str(exc).lower() and attempt < max_retries:
-                        time.sleep(0.1 * (2 ** (attempt - 1)) + random.uniform(0, 0.1))
-                        continue
+                # 已经 ``close()``：重新打开一次，之后照常走上面那一行。
+                self._open()
+                cx = self._db._cx
+            try:
+                return cx.execute(sql, params)
+            except sqlite3.OperationalError as exc:
+                message = str(exc).lower()
+                if "locked" in message or "busy" in message:
                     raise SqlCacheError(f"数据库被锁定，可能是多进程同时访问导致的。请稍后重试: {exc}")
-                except sqlite3.Error as exc:
-                    raise SqlCacheError(f"数据库操作失败: {exc}")
-                except Exception as exc:
-                    raise SqlCacheError(f"数据库操作失败: {exc}")
+                raise SqlCacheError(f"数据库操作失败: {exc}")
+            except sqlite3.Error as exc:
+                raise SqlCacheError(f"数据库操作失败: {exc}")
+            except Exception as exc:
+                raise SqlCacheError(f"数据库操作失败: {exc}")
 
     def _exec_no_result(self, sql: str, params: tuple = ()) -> None:
         """执行一条 SQL 并立刻关闭游标，不读取结果。用于写路径。"""
-        cu = self._exec_with_retry(sql, params)
+        cu = self._exec_cursor(sql, params)
         cu.close()
 
     def _exec_fetchone(self, sql: str, params: tuple = ()):
         """执行一条 SQL 并返回 ``cursor.fetchone()``；完成后关闭游标。"""
-        cu = self._exec_with_retry(sql, params)
+        cu = self._exec_cursor(sql, params)
         try:
             return cu.fetchone()
         finally:
@@ -253,114 +848,514 @@ class _SqlCacheDatabase:
     def _generate_key(self, func_name: str, args: tuple, kwargs: dict) -> bytes:
         """生成缓存键。
 
-        返回 16 字节 BLAKE2b 摘要（原始 bytes，不做 hex 编码）：
+        返回截断到 16 字节的 SHA-256 摘要（原始 bytes，不做 hex 编码）：
 
         - 相比旧版 ``md5(pickle.dumps(...)).hexdigest()``：
           1) 跳过 ``pickle.dumps`` 的解释器字节码构造——对 ``(int|str|
              bytes|float|bool|None)`` 常见参数走 ``repr`` 快路径，几乎所有
              实际调用点都会命中；
-          2) 用 BLAKE2b 取代 MD5，在 CPython 上等速或略快，且输出截断到
-             16 字节，足够做进程内缓存键且显著减小 SQLite 索引体积；
+          2) 用 SHA-256 取代 MD5：``hashlib.sha256`` 走 OpenSSL，在带 SHA-NI /
+             ARMv8 crypto 扩展的 CPU 上由专用指令完成轮函数，实测短键比
+             BLAKE2b 略快、pickle 出来的大参数快约 3 倍（100 KB：84 µs vs
+             240 µs）。输出截断到 16 字节，足够做缓存键且显著减小 SQLite
+             索引体积；
           3) 直接返回 ``bytes``，省掉 ``hexdigest`` 的 Unicode 构造。
+
+        没有换成 xxHash / BLAKE3 + ``orjson``：键会被多个进程、不同环境
+        共享，哈希算法不能因为装没装某个可选包而变化；``orjson`` 也序列化
+        不了任意参数对象，最终仍要回退 pickle。常见参数本来就走 ``repr``
+        快路径，16 字节的 SHA-256 在这里只占几百纳秒。
         """
-        if all(type(a) in _FAST_KEY_TYPES for a in args) and all(
-            type(k) is str and type(v) in _FAST_KEY_TYPES for k, v in kwargs.items()
-        ):
-            if kwargs:
-                data = f"{func_name}\x00{args!r}\x00{sorted(kwargs.items())!r}".encode()
-            else:
-                data = f"{func_name}\x00{args!r}".encode()
+        # 类型检查用显式 for 循环而不是 ``all(<genexpr>)``：后者每次调用都要
+        # 创建生成器对象并逐项恢复帧，在 1~3 个参数的常见场景下比哈希本身还贵。
+        data = None
+        for a in args:
+            if type(a) not in _FAST_KEY_TYPES:
+                break
         else:
+            if not kwargs:
+                data = f"{func_name}\x00{args!r}".encode()
+            else:
+                for k, v in kwargs.items():
+                    if type(k) is not str or type(v) not in _FAST_KEY_TYPES:
+                        break
+                else:
+                    data = f"{func_name}\x00{args!r}\x00{sorted(kwargs.items())!r}".encode()
+        if data is None:
             data = pickle.dumps((func_name, args, tuple(sorted(kwargs.items()))), protocol=5)
-        return hashlib.blake2b(data, digest_size=16).digest()
+        return hashlib.sha256(data).digest()[:16]
 
     def get(self, key: bytes, ttl: Optional[float] = None) -> Optional[Any]:
         """获取缓存值。
 
         以前每次命中都会同步执行一次 ``UPDATE access_count + last_access``，
         在 WAL 模式下这是实打实的磁盘写，让热缓存的读路径多花一次 SQLite
-        ``execute``（profile 显示读 2k 次要跑 10k 次 ``execute``）。现在改
-        成概率性采样更新——LRU 只关心相对顺序，被跳过的 ~90% 命中不会
-        让最终淘汰顺序出现显著偏差，但读路径的 execute 次数直接减半。
+        ``execute``（profile 显示读 2k 次要跑 10k 次 ``execute``）。多进程
+        模式下改成概率性采样更新——LRU 只关心相对顺序，被跳过的 ~90% 命中
+        不会让最终淘汰顺序出现显著偏差，但读路径的 execute 次数直接减半。
+        独占模式下命中只记在内存里（见 :meth:`_flush_touches`），读路径
+        完全不写库。
         """
-        current_time = time.time()
+        current_time = _now_ms()
+        cutoff = current_time - int(ttl * 1000) if ttl else None
 
-        if ttl:
-            row = self._exec_fetchone(
-                "SELECT value FROM cache WHERE key = ? AND created_at > ?",
-                (key, current_time - ttl),
-            )
-        else:
-            row = self._exec_fetchone("SELECT value FROM cache WHERE key = ?", (key,))
+        # 独占模式下 Bloom filter 说"不存在"就一定不存在，省掉一次 SELECT。
+        bloom = self._bloom
+        if bloom is not None and key not in bloom:
+            return None
+
+        if self._writer is not None:
+            pending = self._writer.lookup(key)
+            if pending is not None:
+                # 还在写队列里的行：按同样的规则判断过期。
+                _, compressed_value, created_at, _, _, expires_at = pending
+                if (expires_at is not None and expires_at <= current_time) or (cutoff is not None and created_at <= cutoff):
+                    return None
+                return self.serializer.unserialize(self._decompress(compressed_value))
+
+        touches = self._touches
+        if touches is not None:
+            row = self._select_value(key, current_time, cutoff)
+            if row is None:
+                return None
+            # ``write_behind`` 时连接允许跨线程共享，缓冲区的读改写和
+            # :meth:`_flush_touches` 的遍历都要在同一把锁下进行。
+            with self._lock:
+                hit = touches.get(key)
+                if hit is None:
+                    touches[key] = [current_time, 1]
+                    full = len(touches) >= _TOUCH_BUFFER_MAX
+                else:
+                    hit[0] = current_time
+                    hit[1] += 1
+                    full = False
+            # 写回要先等后台写线程落盘，而写线程也要拿这把锁，所以放到锁外。
+            if full:
+                self._flush_touches()
+            return self.serializer.unserialize(self._decompress(row[0]))
+
+        # 先用只读的 SELECT 探测：未命中在 WAL 下从不等锁。若直接发
+        # ``UPDATE ... RETURNING``，即使一行都没匹配也要先拿写锁，未命中会
+        # 被别的写者挡住整个 ``busy_timeout``。
+        row = self._select_value(key, current_time, cutoff)
         if row is None:
             return None
 
-        # 采样更新：~1/8 概率真正写回 ``last_access``。Redis 的近似 LRU 也
-        # 用类似的采样思路；对上层 ``cleanup_lru`` 的行为几乎无影响。
+        # 采样更新：命中时 ~1/8 概率真正写回 ``last_access``。Redis 的近似
+        # LRU 也用类似的采样思路；对上层 ``cleanup_lru`` 的行为几乎无影响。
         if random.random() < _ACCESS_UPDATE_SAMPLE_RATE:
+            # 写锁拿不到就少记一次访问，无伤大雅。
             with suppress(SqlCacheError):
-                self._exec_no_result(
-                    "UPDATE cache SET access_count = access_count + 1, last_access = ? WHERE key = ?",
-                    (current_time, key),
-                )
+                self._exec_no_result(_TOUCH_SQL, (current_time, key))
 
         compressed_value = row[0]
-        decompressed_value = self._db.compressor.decompress(compressed_value)
+        decompressed_value = self._decompress(compressed_value)
         return self.serializer.unserialize(decompressed_value)
 
-    def set(self, key: bytes, value: Any):
-        """设置缓存值"""
-        current_time = time.time()
+    def _select_value(self, key: bytes, now: int, cutoff: Optional[int]):
+        if cutoff is None:
+            return self._exec_fetchone(_GET_SQL, (key, now))
+        return self._exec_fetchone(_GET_TTL_SQL, (key, now, cutoff))
+
+    def set(self, key: bytes, value: Any, ttl: Optional[float] = None):
+        """设置缓存值；给出 ``ttl`` 时同时写入绝对过期时间 ``expires_at``。"""
+        current_time = _now_ms()
+        expires_at = current_time + int(ttl * 1000) if ttl else None
         serialized_value = self.serializer.serialize(value)
         compressed_value = self._db.compressor.compress(serialized_value)
 
-        self._exec_no_result(
-            "INSERT OR REPLACE INTO cache (key, value, created_at, access_count, last_access) VALUES (?, ?, ?, ?, ?)",
-            (key, compressed_value, current_time, 1, current_time),
-        )
+        row = (key, compressed_value, current_time, 1, current_time, expires_at)
+        touches = self._touches
+        if touches is not None:
+            # 新值的 ``access_count`` 从 1 重新算，旧值攒下的命中作废。
+            with self._lock:
+                touches.pop(key, None)
+        counters = self._counters
+        if self._writer is not None:
+            self._writer.put_row(row)
+        elif counters is None:
+            self._exec_no_result(_STORE_SQL, row)
+        else:
+            with self._lock:
+                if self._exec_rowcount(_INSERT_NEW_SQL, row):
+                    counters[0] += 1
+                    if counters[1] is not None:
+                        counters[1] += 1
+                else:
+                    # 覆盖已有行：行数不变，但旧的 access_count 不知道。
+                    self._exec_no_result(_REPLACE_EXISTING_SQL, row)
+                    counters[1] = None
+
+        bloom = self._bloom
+        if bloom is not None:
+            bloom.add(key)
+            if bloom.saturated:
+                self._rebuild_bloom()
+
+    def _rebuild_bloom(self):
+        """按表里现存的键重建 Bloom filter（同时丢掉已删除键留下的位）。"""
+        self.flush()
+        with self._lock:
+            with self._execute(_ALL_KEYS_SQL) as cur:
+                keys = [row[0] for row in cur.fetchall()]
+        bloom = _BloomFilter(max(_BLOOM_MIN_CAPACITY, 2 * len(keys)))
+        for key in keys:
+            bloom.add(key)
+        self._bloom = bloom
+
+    def _exec_rowcount(self, sql: str, params: tuple = ()) -> int:
+        cu = self._exec_cursor(sql, params)
+        try:
+            return cu.rowcount
+        finally:
+            cu.close()
+
+    def _reseed_counters(self):
+        with self._lock:
+            row = self._exec_fetchone(_COUNT_SUM_SQL)
+            if self._counters is None:
+                self._counters = [row[0], row[1] or 0]
+            else:
+                # 原地更新：``set`` 等可能已在别的线程里拿到了这个列表。
+                self._counters[:] = [row[0], row[1] or 0]
+
+    def _delete_rows(self, sql: str, params: tuple = ()) -> None:
+        """执行一条 DELETE，并在维护增量统计时扣掉被删行的计数。"""
+        counters = self._counters
+        if counters is None:
+            self._exec_no_result(sql, params)
+            return
+        with self._lock:
+            if _HAS_RETURNING:
+                with self._execute(sql + " RETURNING access_count", params) as cur:
+                    removed = cur.fetchall()
+                counters[0] -= len(removed)
+                if counters[1] is not None:
+                    counters[1] -= sum(r[0] or 0 for r in removed)
+            else:
+                counters[0] -= self._exec_rowcount(sql, params)
+                counters[1] = None
+
+    def _flush_touches(self) -> None:
+        """把独占模式下积攒的命中一次 ``executemany`` 写回 ``cache`` 表。
+
+        ``last_access`` 取 ``max``，不会被更早的记录往回改。写回失败（例如
+        表被锁）时丢掉这批记录：它们只影响淘汰顺序，不影响缓存正确性。
+
+        缓冲区始终是同一个 dict，只在 ``self._lock`` 下读写、原地清空，
+        别的线程先前取到的引用不会指向一个正在被遍历的旧对象。
+        """
+        if not self._touches:
+            return
+        # 先落盘排队中的 ``set``，命中的行才在表里。
+        self.flush()
+        with self._lock:
+            touches = self._touches
+            params = [(hits, last, key) for key, (last, hits) in touches.items()]
+            touches.clear()
+            try:
+                self._exec_no_result("BEGIN IMMEDIATE")
+            except SqlCacheError:
+                return
+            cx = self._db._cx
+            try:
+                updated = cx.executemany(_TOUCH_BATCH_SQL, params).rowcount
+            except sqlite3.Error:
+                with suppress(sqlite3.Error):
+                    cx.execute("ROLLBACK")
+                return
+            self._exec_no_result("COMMIT")
+            counters = self._counters
+            if counters is not None and counters[1] is not None:
+                if updated == len(params):
+                    counters[1] += sum(p[0] for p in params)
+                else:
+                    counters[1] = None
+
+    def flush(self):
+        """``write_behind`` 模式下等待排队的写入全部提交；否则是 no-op。"""
+        if self._writer is not None:
+            self._writer.flush()
 
     def delete(self, key: bytes):
         """删除缓存项"""
-        self._exec_no_result("DELETE FROM cache WHERE key = ?", (key,))
+        # 先落盘排队中的写入，否则稍后提交的旧 ``set`` 会把删掉的行写回来。
+        self.flush()
+        if self._touches is not None:
+            with self._lock:
+                self._touches.pop(key, None)
+        self._delete_rows(_DELETE_SQL, (key,))
 
     def clear(self):
-        """清空所有缓存"""
-        self._exec_no_result("DELETE FROM cache")
+        """清空所有缓存。
 
-    def cleanup_expired(self, ttl: float):
-        """清理过期缓存"""
-        current_time = time.time()
-        self._exec_no_result("DELETE FROM cache WHERE created_at < ?", (current_time - ttl,))
+        ``DELETE FROM cache`` 要逐页写日志，文件也不会变小；这里在一个事务
+        里 ``DROP`` 掉表再按当前结构重建表和索引，开销和表多大无关，腾出的
+        页留给之后的写入复用。
+        """
+        self.flush()
+        with self._lock:
+            self._exec_no_result("BEGIN IMMEDIATE")
+            cx = self._db._cx
+            try:
+                for sql in (
+                    _DROP_SQL,
+                    self.BUILD_TABLE,
+                    self.CREATE_INDEX,
+                    self.CREATE_ACCESS_INDEX,
+                    self.CREATE_EXPIRES_INDEX,
+                ):
+                    cx.execute(sql)
+            except sqlite3.Error as exc:
+                with suppress(sqlite3.Error):
+                    cx.execute("ROLLBACK")
+                raise SqlCacheError(f"数据库操作失败: {exc}") from exc
+            self._exec_no_result("COMMIT")
+        if self._bloom is not None:
+            self._bloom = _BloomFilter(_BLOOM_MIN_CAPACITY)
+        with self._lock:
+            if self._counters is not None:
+                self._counters[:] = [0, 0]
+            if self._touches is not None:
+                self._touches.clear()
+
+    def cleanup_expired(self, ttl: Optional[float] = None):
+        """清理过期缓存。
+
+        ``expires_at`` 有索引，``DELETE ... WHERE expires_at < now`` 是一次
+        b-tree 范围扫描。给出 ``ttl`` 时还按 ``created_at`` 清理，覆盖迁移前
+        没有 ``expires_at`` 的旧行和 ttl 被调短的情况（同样走索引）。
+        """
+        current_time = _now_ms()
+        if ttl:
+            sql, params = _EXPIRE_TTL_SQL, (current_time, current_time - int(ttl * 1000))
+        else:
+            sql, params = _EXPIRE_SQL, (current_time,)
+        if self._writer is not None:
+            self._writer.put_statement(sql, params)
+        else:
+            self._delete_rows(sql, params)
 
     def cleanup_lru(self, max_size: int):
         """清理LRU缓存，保留最近访问的max_size个"""
-        row = self._exec_fetchone("SELECT COUNT(*) FROM cache")
+        # 淘汰按 ``last_access`` 排序，先把内存里的命中写回。
+        self._flush_touches()
+        if self._writer is not None:
+            # 排在本批写入之后执行；每块最多删 ``_CLEANUP_CHUNK_ROWS`` 行，
+            # 后台线程逐块删到不超出 ``max_size`` 为止。
+            self._writer.put_statement(_CLEANUP_LRU_SQL, (_CLEANUP_CHUNK_ROWS, max_size), repeat=True)
+            return
+
+        # 淘汰量始终按表里的真实行数算：即便独占，增量计数只用于统计，
+        # 多删或少删都比统计偏差严重得多。
+        row = self._exec_fetchone(_COUNT_SQL)
         count = row[0] if row else 0
 
-        if count > max_size:
-            excess = count - max_size
-            self._exec_no_result(
-                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_access ASC LIMIT ?)",
-                (excess,),
+        # 分块删除：autocommit 下每条 DELETE 自成一个短事务、且各自单独拿
+        # ``self._lock``，大批量淘汰时写锁会被频繁释放，其它线程 / 进程的
+        # 读写不会被一次性长事务卡住。``ORDER BY last_access LIMIT`` 走
+        # ``idx_last_access`` 索引，不需要临时排序。
+        excess = count - max_size
+        while excess > 0:
+            chunk = min(excess, _CLEANUP_CHUNK_ROWS)
+            self._delete_rows(_TRIM_LRU_SQL, (chunk,))
+            excess -= chunk
+
+    def _decompress(self, blob: bytes) -> bytes:
+        try:
+            return self._db.compressor.decompress(blob)
+        except Exception:
+            # 可能是别的连接刚 ``optimize_compression`` 过：值已用新字典压缩，
+            # 本连接手里还是无字典的压缩器。重新加载一次字典再试。
+            with self._lock:
+                zstd_dict = self._db._load_zstd_dict()
+            if zstd_dict is None:
+                raise
+            self._db.compressor = ZstdCompressor(
+                level=self._db.compress_level, zstd_dict=zstd_dict, raw_threshold=RAW_VALUE_THRESHOLD
             )
+            return self._db.compressor.decompress(blob)
+
+    def optimize_compression(self):
+        """用现有缓存值训练 zstd 字典，并据此重新压缩所有行。
+
+        相似的缓存值（同一函数的返回值）共享大量结构，字典能把小值的压缩率
+        再提高数倍；字典存进 ``Zstd`` 表，以后打开同一文件会自动加载。
+        重新压缩和保存字典在同一个事务里完成。
+
+        只应在没有其它进程同时使用该缓存文件时调用：别的进程遇到新字典
+        压缩的值会自动重新加载字典，但如果它们已经持有一份旧字典（之前
+        优化过一次），就无法可靠地察觉字典已经更换。
+        """
+        self.flush()
+        with self._lock:
+            with self._execute(_ALL_ROWS_SQL) as cur:
+                rows = cur.fetchall()
+            if not rows:
+                return
+            samples = [self._decompress(value) for _, value in rows]
+            try:
+                zstd_dict = ZstdCompressor.optimize_dict(samples)
+            except Exception as exc:
+                raise SqlCacheError(f"训练 zstd 字典失败（样本可能太少）: {exc}")
+            compressor = ZstdCompressor(level=self._db.compress_level, zstd_dict=zstd_dict)
+            blobs = compressor.compress_batch(samples, threads=-1)
+
+            cx = self._db._cx
+            self._exec_no_result("BEGIN IMMEDIATE")
+            try:
+                cx.executemany(_RECOMPRESS_SQL, zip(blobs, (key for key, _ in rows)))
+                self._db._save_zstd_dict(zstd_dict)
+            except BaseException as exc:
+                with suppress(sqlite3.Error):
+                    cx.execute("ROLLBACK")
+                if isinstance(exc, (sqlite3.Error, OSError)):
+                    raise SqlCacheError(f"数据库操作失败: {exc}") from exc
+                raise
+            self._exec_no_result("COMMIT")
+            self._db.compressor = compressor
 
     def get_stats(self) -> dict:
-        """获取缓存统计信息"""
-        with self._execute("SELECT COUNT(*), AVG(access_count), MAX(last_access) FROM cache") as cursor:
-            row = cursor.fetchone()
-            return {"total_items": row[0] or 0, "avg_access_count": row[1] or 0, "last_access": row[2] or 0}
+        """获取缓存统计信息。
+
+        独占模式下行数和平均访问次数来自增量计数，``last_access`` 是走
+        ``idx_last_access`` 索引的 ``MAX``，都不扫全表；其它情况退回一次
+        聚合查询。
+        """
+        self._flush_touches()
+        self.flush()
+        counters = self._counters
+        if counters is not None:
+            if counters[1] is None:
+                self._reseed_counters()
+                counters = self._counters
+            total, access_sum = counters
+            row = self._exec_fetchone(_MAX_ACCESS_SQL)
+            last_access = row[0]
+            avg_access = access_sum / total if total else 0
+        else:
+            with self._execute(_STATS_SQL) as cursor:
+                total, avg_access, last_access = cursor.fetchone()
+        # ``last_access`` 对外仍以秒为单位，与 ``time.time()`` 一致。
+        return {
+            "total_items": total or 0,
+            "avg_access_count": avg_access or 0,
+            "last_access": last_access / 1000 if last_access else 0,
+        }
 
     def close(self):
-        """关闭数据库连接（幂等）。"""
+        """关闭数据库连接（幂等）。
+
+        关闭后对象仍可继续使用：下一次操作会重新打开连接（见 :meth:`_open`）。
+        """
         # 先撤销 finalizer，避免 GC 时再跑一次
         finalizer = getattr(self, "_finalizer", None)
         if finalizer is not None and finalizer.alive:
             finalizer.detach()
+            # 只在第一次关闭时写回命中；之后连接已经关了。
+            with suppress(Exception):
+                self._flush_touches()
+        writer = getattr(self, "_writer", None)
+        if writer is not None:
+            writer.close()
+            # 关闭后再 ``set`` 会走同步写入，由它触发重新打开（连同新的写线程）。
+            self._writer = None
         if hasattr(self, "_db"):
             with suppress(Exception):
                 self._db.close()
 
 
+# ``shards=-1`` 时分片数取 CPU 核数，并限制在这个范围内。
+_MAX_AUTO_SHARDS = 16
+
+
+class _ShardedSqlCacheDatabase:
+    """把缓存按键分散到 N 个 SQLite 文件（``cache.db.0`` …），思路同 diskcache 的 FanoutCache。
+
+    SQLite 每个文件同一时刻只允许一个写者；分片后每片有自己的连接、写锁
+    和 ``_SqlCacheDatabase`` 的全部内存结构，落在不同分片上的写入互不等待。
+    接口与 ``_SqlCacheDatabase`` 相同：单键操作按键路由到一个分片，
+    ``clear`` / ``cleanup_*`` / ``flush`` 逐片执行，``get_stats`` 汇总；
+    ``cleanup_*_for(key, ...)`` 只整理 ``key`` 所在的一片。
+
+    ``cleanup_lru(max_size)`` 给每片 ``ceil(max_size / N)`` 的配额：键是
+    均匀的摘要，各片行数基本一致，总量最多比 ``max_size`` 多 N - 1 行。
+    """
+
+    def __init__(self, cache_path: Union[str, Path], shards: int, **kwargs):
+        if shards < 0:
+            shards = min(max(os.cpu_count() or 1, 1), _MAX_AUTO_SHARDS)
+        if shards < 1:
+            raise ValueError("shards 必须是正整数，或 -1 表示按 CPU 核数自动选择")
+        self.cache_path = Path(cache_path)
+        self.multiprocess_safe = kwargs.get("multiprocess_safe", True)
+        self._shards = [
+            _SqlCacheDatabase(self.cache_path.with_name(f"{self.cache_path.name}.{i}"), **kwargs) for i in range(shards)
+        ]
+        self._generate_key = self._shards[0]._generate_key
+
+    def _shard(self, key) -> _SqlCacheDatabase:
+        shards = self._shards
+        if isinstance(key, bytes):
+            # ``_generate_key`` 产出的是 SHA-256 摘要，首字节已经足够均匀。
+            return shards[key[0] % len(shards)]
+        # 其它类型的键用 crc32：``hash(str)`` 每个进程随机化，不能用来定位文件。
+        return shards[zlib.crc32(str(key).encode()) % len(shards)]
+
+    def get(self, key, ttl: Optional[float] = None) -> Optional[Any]:
+        return self._shard(key).get(key, ttl)
+
+    def set(self, key, value: Any, ttl: Optional[float] = None):
+        self._shard(key).set(key, value, ttl)
+
+    def delete(self, key):
+        self._shard(key).delete(key)
+
+    def flush(self):
+        for shard in self._shards:
+            shard.flush()
+
+    def clear(self):
+        for shard in self._shards:
+            shard.clear()
+
+    def cleanup_expired(self, ttl: Optional[float] = None):
+        for shard in self._shards:
+            shard.cleanup_expired(ttl)
+
+    def cleanup_lru(self, max_size: int):
+        quota = -(-max_size // len(self._shards))
+        for shard in self._shards:
+            shard.cleanup_lru(quota)
+
+    def cleanup_lru_for(self, key, max_size: int):
+        """只按配额整理 ``key`` 所在的分片；装饰器每次写入后走这条路径。"""
+        self._shard(key).cleanup_lru(-(-max_size // len(self._shards)))
+
+    def cleanup_expired_for(self, key, ttl: Optional[float] = None):
+        """只清理 ``key`` 所在分片的过期项。"""
+        self._shard(key).cleanup_expired(ttl)
+
+    def optimize_compression(self):
+        """逐片训练字典：每片的值来自同一批函数，各自训练即可。"""
+        for shard in self._shards:
+            shard.optimize_compression()
+
+    def get_stats(self) -> dict:
+        stats = [shard.get_stats() for shard in self._shards]
+        total = sum(s["total_items"] for s in stats)
+        access_sum = sum(s["total_items"] * s["avg_access_count"] for s in stats)
+        return {
+            "total_items": total,
+            "avg_access_count": access_sum / total if total else 0,
+            "last_access": max(s["last_access"] for s in stats),
+        }
+
+    def close(self):
+        for shard in self._shards:
+            shard.close()
+
+
 class SqlCache:
     """SQLite缓存装饰器类"""
 
@@ -371,6 +1366,11 @@ class SqlCache:
         ttl: Optional[float] = None,
         cache_type: str = "lru",
         multiprocess_safe: bool = True,
+        tinylfu: bool = False,
+        pragmas: Optional[dict] = None,
+        write_behind: bool = False,
+        shards: int = 1,
+        exclusive: bool = False,
     ):
         """
         初始化SQLite缓存
@@ -381,6 +1381,19 @@ class SqlCache:
             ttl: 缓存时间（秒），None表示不过期
             cache_type: 缓存类型，"ttl"或"lru"
             multiprocess_safe: 是否启用多进程安全模式
+            tinylfu: 内存缓存是否启用 TinyLFU 准入（仅对 "lru" 生效），
+                冷热混合、带顺序扫描的访问模式下命中率更高
+            pragmas: 逐项覆盖 SQLite 连接 PRAGMA（见 ``_SqlCacheDatabase``）
+            write_behind: 未命中时的写入交给后台线程批量提交，函数返回不再
+                等待磁盘；其它进程要稍后（或 :meth:`flush` 之后）才能看到
+            shards: 大于 1 时把磁盘缓存分散到 ``cache_path.0`` … 多个文件，
+                各自有独立的写锁，并发写入不再串行；``-1`` 按 CPU 核数选择。
+                分片数决定键落在哪个文件，同一缓存路径应始终使用相同的值
+            exclusive: 承诺本实例是缓存文件唯一的使用者（没有别的进程，也
+                没有别的实例打开同一路径；需配合 ``multiprocess_safe=False``）。
+                开启后未命中可由 Bloom filter 直接判定、统计走增量计数、命中
+                不再写库；多个实例共用同一路径（如都用默认的 ``cache.db``）
+                时不要开启
         """
         self.cache_path = cache_path
         self.max_size = max_size
@@ -392,11 +1405,22 @@ class SqlCache:
             raise ValueError("cache_type必须是'ttl'或'lru'")
 
         # 创建数据库实例
-        self._db = _SqlCacheDatabase(cache_path, multiprocess_safe=multiprocess_safe)
+        db_kwargs = {
+            "multiprocess_safe": multiprocess_safe,
+            "pragmas": pragmas,
+            "write_behind": write_behind,
+            "exclusive": exclusive,
+        }
+        if shards == 1:
+            self._db = _SqlCacheDatabase(cache_path, **db_kwargs)
+        else:
+            self._db = _ShardedSqlCacheDatabase(cache_path, shards, **db_kwargs)
 
         # 创建内存缓存用于快速访问
         if self.cache_type == "ttl":
             self._memory_cache = _TTLCache(maxsize=max_size, ttl=ttl or 3600)
+        elif tinylfu:
+            self._memory_cache = _TinyLFUCache(maxsize=max_size)
         else:
             self._memory_cache = _LRUCache(maxsize=max_size)
 
@@ -416,52 +1440,109 @@ class SqlCache:
         # ``repr`` 作为 ``getattr`` 的默认值会被急切求值，profile 显示这
         # 一条路径每次调用多花 ~0.5 µs，纯浪费。
         func_name = getattr(func, "__name__", None) or repr(func)
+        normalize = _make_arg_normalizer(func)
+
+        # 热路径上的可调用对象在装饰时绑定成闭包局部变量：每次调用省掉
+        # ``self._db`` / ``self._memory_cache`` 的属性查找和绑定方法的创建，
+        # 对 ``x * 2`` 这种廉价函数，这部分开销比函数本身还大。
+        # 注意闭包仍然要引用 ``self``（下面的 ``self._cleanup``）：
+        # ``@lru_cache(...)`` 用完就丢掉 ``SqlCache`` 实例，只剩 wrapper，
+        # 不引用的话实例被回收，finalizer 会把连接关掉。
+        generate_key = self._db._generate_key
+        memory_get = self._memory_cache.get
+        memory_set = self._memory_cache.__setitem__
+        db_get = self._db.get
+        db_set = self._db.set
+        ttl = self.ttl
+        no_kwargs: dict = {}
+
+        if normalize is not None:
+            # 签名简单时直接生成和原函数同签名的 wrapper，连打包参数都省掉。
+            fast = _make_fast_wrapper(
+                func,
+                func=func,
+                name=func_name,
+                key=generate_key,
+                mget=memory_get,
+                mset=memory_set,
+                dget=db_get,
+                dset=db_set,
+                ttl=ttl,
+                cleanup=self._cleanup,
+                missing=_MISSING,
+                nokw=no_kwargs,
+            )
+            if fast is not None:
+                return wraps(func)(fast)
 
         @wraps(func)
         def wrapper(*args, **kwargs):
-            cache_key = self._db._generate_key(func_name, args, kwargs)
+            positional = normalize(args, kwargs) if normalize is not None else None
+            if positional is not None:
+                cache_key = generate_key(func_name, positional, no_kwargs)
+            else:
+                cache_key = generate_key(func_name, args, kwargs)
 
-            # 先尝试从内存缓存获取
-            if cache_key in self._memory_cache:
-                return self._memory_cache[cache_key]
+            # 先尝试从内存缓存获取（单次探测，None 也是合法的缓存值）
+            cached_value = memory_get(cache_key, _MISSING)
+            if cached_value is not _MISSING:
+                return cached_value
 
             # 从SQLite缓存获取
-            cached_value = self._db.get(cache_key, self.ttl)
+            cached_value = db_get(cache_key, ttl)
             if cached_value is not None:
                 # 更新内存缓存
-                self._memory_cache[cache_key] = cached_value
+                memory_set(cache_key, cached_value)
                 return cached_value
 
             # 执行函数并缓存结果
             result = func(*args, **kwargs)
 
             # 存储到SQLite缓存
-            self._db.set(cache_key, result)
+            db_set(cache_key, result, ttl)
 
             # 更新内存缓存
-            self._memory_cache[cache_key] = result
+            memory_set(cache_key, result)
 
             # 执行清理策略
-            self._cleanup()
+            self._cleanup(cache_key)
 
             return result
 
         return wrapper
 
-    def _cleanup(self):
-        """执行缓存清理"""
-        if self.cache_type == "ttl" and self.ttl:
+    def _cleanup(self, key: Optional[bytes] = None):
+        """执行缓存清理。
+
+        给出 ``key``（刚写入的键）且磁盘缓存分片时，只整理它所在的那一片：
+        每次未命中都跑清理，逐片执行会让每次写入都去拿全部分片的锁。
+        """
+        db = self._db
+        if key is not None and isinstance(db, _ShardedSqlCacheDatabase):
+            if self.cache_type == "ttl" and self.ttl:
+                db.cleanup_expired_for(key, self.ttl)
+            else:
+                db.cleanup_lru_for(key, self.max_size)
+        elif self.cache_type == "ttl" and self.ttl:
             # TTL缓存：清理过期项
-            self._db.cleanup_expired(self.ttl)
+            db.cleanup_expired(self.ttl)
         else:
             # LRU缓存：清理超出最大数量的项
-            self._db.cleanup_lru(self.max_size)
+            db.cleanup_lru(self.max_size)
 
     def clear(self):
         """清空所有缓存"""
         self._db.clear()
         self._memory_cache.clear()
 
+    def flush(self):
+        """等待 ``write_behind`` 排队的写入全部提交。"""
+        self._db.flush()
+
+    def optimize(self):
+        """训练 zstd 字典并重新压缩磁盘缓存（见 ``_SqlCacheDatabase.optimize_compression``）。"""
+        self._db.optimize_compression()
+
     def get_stats(self) -> dict:
         """获取缓存统计信息"""
         db_stats = self._db.get_stats()
@@ -495,6 +1576,10 @@ def sqlcache(
     ttl: Optional[float] = None,
     cache_type: str = "lru",
     multiprocess_safe: bool = True,
+    tinylfu: bool = False,
+    write_behind: bool = False,
+    shards: int = 1,
+    exclusive: bool = False,
 ):
     """
     SQLite缓存装饰器
@@ -505,12 +1590,25 @@ def sqlcache(
         ttl: 缓存时间（秒），None表示不过期
         cache_type: 缓存类型，"ttl"或"lru"
         multiprocess_safe: 是否启用多进程安全模式
+        tinylfu: 内存缓存是否启用 TinyLFU 准入（仅对 "lru" 生效）
+        write_behind: 是否由后台线程批量提交写入
+        shards: 磁盘缓存分片文件数，``-1`` 按 CPU 核数选择
+        exclusive: 承诺本实例独占缓存文件（见 ``SqlCache``），需配合
+            ``multiprocess_safe=False``
 
     Returns:
         装饰器函数
     """
     cache = SqlCache(
-        cache_path=cache_path, max_size=max_size, ttl=ttl, cache_type=cache_type, multiprocess_safe=multiprocess_safe
+        cache_path=cache_path,
+        max_size=max_size,
+        ttl=ttl,
+        cache_type=cache_type,
+        multiprocess_safe=multiprocess_safe,
+        tinylfu=tinylfu,
+        write_behind=write_behind,
+        shards=shards,
+        exclusive=exclusive,
     )
     return cache
 
@@ -521,6 +1619,8 @@ def ttl_cache(cache_path: str = "cache.db", max_size: int = 1000, ttl: float = 3
     return sqlcache(cache_path=cache_path, max_size=max_size, ttl=ttl, cache_type="ttl", multiprocess_safe=multiprocess_safe)
 
 
-def lru_cache(cache_path: str = "cache.db", max_size: int = 1000, multiprocess_safe: bool = True):
+def lru_cache(cache_path: str = "cache.db", max_size: int = 1000, multiprocess_safe: bool = True, tinylfu: bool = False):
     """LRU缓存装饰器"""
-    return sqlcache(cache_path=cache_path, max_size=max_size, cache_type="lru", multiprocess_safe=multiprocess_safe)
+    return sqlcache(
+        cache_path=cache_path, max_size=max_size, cache_type="lru", multiprocess_safe=multiprocess_safe, tinylfu=tinylfu
+    )
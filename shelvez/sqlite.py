@@ -1,28 +1,37 @@
 import os
+import re
 import sqlite3
+from itertools import chain
 from pathlib import Path
 from contextlib import suppress, closing, contextmanager
-from collections.abc import MutableMapping
+from collections.abc import Mapping, MutableMapping
 
 from .zstd import ZstdCompressor
 
+# ``WITHOUT ROWID`` stores rows directly in the primary-key b-tree, so a
+# lookup is one b-tree walk instead of key index -> rowid table. Tables
+# created by older versions keep their rowid layout until
+# ``optimize_database`` rebuilds them.
 BUILD_TABLE = """
   CREATE TABLE IF NOT EXISTS Dict (
-    key TEXT UNIQUE NOT NULL PRIMARY KEY,
+    key TEXT PRIMARY KEY NOT NULL,
     value BLOB NOT NULL
-  )
+  ) WITHOUT ROWID
 """
-GET_SIZE = "SELECT COUNT(key) FROM Dict"
+# ``COUNT(*)`` lets SQLite count via the smallest b-tree; ``COUNT(key)`` has to
+# read every key to rule out NULLs.
+GET_SIZE = "SELECT COUNT(*) FROM Dict"
 LOOKUP_KEY = "SELECT value FROM Dict WHERE key = ?"
+LOOKUP_MANY = "SELECT key, value FROM Dict WHERE key IN ({})"
 EXISTS_KEY = "SELECT 1 FROM Dict WHERE key = ? LIMIT 1"
 STORE_KV = "REPLACE INTO Dict (key, value) VALUES (?, ?)"
 DELETE_KEY = "DELETE FROM Dict WHERE key = ?"
 ITER_KEYS = "SELECT key FROM Dict"
 BUILD_ZSTD_TABLE = """
   CREATE TABLE IF NOT EXISTS Zstd (
-    key TEXT UNIQUE NOT NULL,
+    key TEXT PRIMARY KEY NOT NULL,
     value BLOB NOT NULL
-  )
+  ) WITHOUT ROWID
 """
 LOOKUP_ZSTD = "SELECT value FROM Zstd WHERE key = ?"
 STORE_ZSTD = "INSERT OR REPLACE INTO Zstd (key, value) VALUES (?, ?)"
@@ -32,22 +41,48 @@ class error(OSError):
     pass
 
 
+# 每个连接打开时执行的吞吐相关 PRAGMA，可通过 ``open(..., pragmas=...)``
+# 逐项覆盖，值为 ``None`` 表示跳过该项。顺序有意义：``page_size`` 只对
+# 全新的文件生效，必须排在会初始化文件的 ``journal_mode`` 和建表之前；
+# 对已有数据库它是无害的 no-op。
+DEFAULT_PRAGMAS = {
+    "page_size": 8192,
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "cache_size": -65536,  # 64 MB page cache
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,  # 256 MB memory-mapped I/O
+}
+
+# 未训练 zstd 字典时，短于该长度的值原样存放（见 ``shelvez.zstd``）。
+RAW_VALUE_THRESHOLD = 64
+
+# 老版本 SQLite 的 SQLITE_MAX_VARIABLE_NUMBER 只有 999，getmany 按此分批。
+_MAX_VARIABLES = 999
+
+# ``__iter__`` 每次 ``fetchmany`` 取回的行数。
+_ITER_BATCH = 1024
+
 _ERR_CLOSED = "DBM object has already been closed"
 _ERR_REINIT = "DBM object does not support reinitialization"
 
 
+_SLASHES_RE = re.compile(r"/{2,}")
+
+
 def _normalize_uri(path):
     path = Path(path)
     uri = path.absolute().as_uri()
-    while "//" in uri:
-        uri = uri.replace("//", "/")
-    return uri
+    # One pass collapsing every run of slashes, instead of rescanning the
+    # whole string until no "//" is left.
+    return _SLASHES_RE.sub("/", uri)
 
 
 class _Database(MutableMapping):
     _cx: sqlite3.Connection | None
 
-    def __init__(self, path, /, *, flag, mode, sqlite3_kargs={}):
+    def __init__(self, path, /, *, flag, mode, sqlite3_kargs={}, pragmas=None, compress_level=3):
         if hasattr(self, "_cx"):
             raise error(_ERR_REINIT)
 
@@ -78,21 +113,21 @@ class _Database(MutableMapping):
 
         self._in_tx = False
 
-        # Throughput PRAGMAs; all strictly advisory, so wrap in suppress.
-        with suppress(sqlite3.OperationalError):
-            self._cx.execute("PRAGMA journal_mode = wal")
-            self._cx.execute("PRAGMA synchronous = normal")
-            self._cx.execute("PRAGMA busy_timeout = 5000")
-            self._cx.execute("PRAGMA cache_size = -20000")
-            self._cx.execute("PRAGMA temp_store = MEMORY")
-            self._cx.execute("PRAGMA mmap_size = 268435456")
+        # Throughput PRAGMAs; all strictly advisory, so each one is wrapped
+        # in suppress (e.g. ``journal_mode`` cannot change on a read-only db).
+        for name, value in {**DEFAULT_PRAGMAS, **(pragmas or {})}.items():
+            if value is None:
+                continue
+            with suppress(sqlite3.OperationalError):
+                self._cx.execute(f"PRAGMA {name} = {value}").close()
 
         if flag == "rwc":
-            self._execute(BUILD_TABLE)
-        self._execute(BUILD_ZSTD_TABLE)
+            self._execute_write(BUILD_TABLE)
+        self._execute_write(BUILD_ZSTD_TABLE)
 
+        self.compress_level = compress_level
         zstd_dict = self._load_zstd_dict()
-        self.compressor = ZstdCompressor(zstd_dict=zstd_dict)
+        self.compressor = ZstdCompressor(level=compress_level, zstd_dict=zstd_dict, raw_threshold=RAW_VALUE_THRESHOLD)
 
     def _execute(self, *args, **kwargs):
         if not self._cx:
@@ -102,49 +137,96 @@ class _Database(MutableMapping):
         except sqlite3.Error as exc:
             raise error(str(exc))
 
+    # 热路径专用：不经过 ``closing`` + ``with`` 的上下文管理器，省掉每次
+    # 查询额外的对象分配和帧切换。``_execute`` 只留给需要流式读取的场景。
+    def _execute_fetchone(self, sql, params=()):
+        if not self._cx:
+            raise error(_ERR_CLOSED)
+        try:
+            cu = self._cx.execute(sql, params)
+            try:
+                return cu.fetchone()
+            finally:
+                cu.close()
+        except sqlite3.Error as exc:
+            raise error(str(exc))
+
+    def _execute_write(self, sql, params=()):
+        """Run a write statement and return its ``rowcount``."""
+        if not self._cx:
+            raise error(_ERR_CLOSED)
+        try:
+            cu = self._cx.execute(sql, params)
+            rowcount = cu.rowcount
+            cu.close()
+            return rowcount
+        except sqlite3.Error as exc:
+            raise error(str(exc))
+
     def __len__(self):
-        with self._execute(GET_SIZE) as cu:
-            row = cu.fetchone()
-        return row[0]
+        return self._execute_fetchone(GET_SIZE)[0]
 
     def __getitem__(self, key):
-        with self._execute(LOOKUP_KEY, (key,)) as cu:
-            row = cu.fetchone()
+        row = self._execute_fetchone(LOOKUP_KEY, (key,))
         if not row:
             raise KeyError(key)
         return self.compressor.decompress(row[0])
 
+    def get(self, key, default=None):
+        # 一次 SELECT，miss 时直接返回 default；不走 Mapping.get 的
+        # ``__getitem__`` + 抛/捕 KeyError 路径。
+        row = self._execute_fetchone(LOOKUP_KEY, (key,))
+        if not row:
+            return default
+        return self.compressor.decompress(row[0])
+
     def __contains__(self, key):
-        with self._execute(EXISTS_KEY, (key,)) as cu:
-            return cu.fetchone() is not None
+        return self._execute_fetchone(EXISTS_KEY, (key,)) is not None
+
+    def getmany(self, keys):
+        """Fetch several keys with ``SELECT ... WHERE key IN (...)``.
+
+        Returns a dict of the keys that exist (missing keys are simply
+        absent), using one round-trip per batch of up to 999 keys instead of
+        one query per key.
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        decompress = self.compressor.decompress
+        for start in range(0, len(keys), _MAX_VARIABLES):
+            batch = keys[start : start + _MAX_VARIABLES]
+            sql = LOOKUP_MANY.format(",".join("?" * len(batch)))
+            with self._execute(sql, batch) as cu:
+                for key, value in cu.fetchall():
+                    found[key] = decompress(value)
+        return found
 
     def __setitem__(self, key, value):
-        value = self.compressor.compress(value)
-        with self._execute(STORE_KV, (key, value)):
-            pass
+        self._execute_write(STORE_KV, (key, self.compressor.compress(value)))
 
     def __delitem__(self, key):
-        with self._execute(DELETE_KEY, (key,)) as cu:
-            if not cu.rowcount:
-                raise KeyError(key)
+        if not self._execute_write(DELETE_KEY, (key,)):
+            raise KeyError(key)
 
     def __iter__(self):
         try:
             with self._execute(ITER_KEYS) as cu:
-                for row in cu:
-                    yield row[0]
+                # 按批 ``fetchmany`` 而不是逐行迭代游标：每批只跨一次 C/Python
+                # 边界，仍然是流式的，不会像 ``keys()`` 那样一次性物化。
+                cu.arraysize = _ITER_BATCH
+                while rows := cu.fetchmany():
+                    for (key,) in rows:
+                        yield key
         except sqlite3.Error as exc:
             raise error(str(exc))
 
     def _load_zstd_dict(self):
-        with self._execute(LOOKUP_ZSTD, ("dict",)) as cu:
-            row = cu.fetchone()
+        row = self._execute_fetchone(LOOKUP_ZSTD, ("dict",))
         if row:
             return row[0]
 
     def _save_zstd_dict(self, zstd_dict):
-        with self._execute(STORE_ZSTD, ("dict", zstd_dict)):
-            pass
+        self._execute_write(STORE_ZSTD, ("dict", zstd_dict))
 
     # ------------------------------------------------------------------
     # Explicit transactions
@@ -192,15 +274,22 @@ class _Database(MutableMapping):
         Every ``__setitem__`` / ``__delitem__`` inside the block goes into
         the same transaction instead of each getting its own fsync. On
         exception the transaction is rolled back.
+
+        If a transaction is already open (``with db:`` or an outer
+        ``transaction()``), the block joins it and leaves commit / rollback
+        to the outer owner instead of committing it early.
         """
+        owns_tx = not self._in_tx
         self.begin()
         try:
             yield self
         except BaseException:
-            self.rollback()
+            if owns_tx:
+                self.rollback()
             raise
         else:
-            self.commit()
+            if owns_tx:
+                self.commit()
 
     def _executemany(self, sql, seq_of_params):
         if not self._cx:
@@ -210,6 +299,49 @@ class _Database(MutableMapping):
         except sqlite3.Error as exc:
             raise error(str(exc))
 
+    def update(self, items=(), /, **kwds):
+        """Store many ``key -> value`` pairs with a single ``executemany``.
+
+        Accepts a mapping or an iterable of ``(key, value)`` pairs, like
+        :meth:`dict.update`. All rows are written inside one transaction
+        (joining the caller's one if already open), so a bulk load costs a
+        single commit instead of one autocommit ``REPLACE`` per key.
+        """
+        if isinstance(items, Mapping):
+            items = items.items()
+        self._store_many(chain(items, kwds.items()))
+
+    def _store_many(self, pairs, threads=0):
+        """Compress and store ``(key, value)`` pairs in one transaction.
+
+        With ``threads`` != 0 the values are compressed up front through
+        :meth:`ZstdCompressor.compress_batch`, which runs zstd on GIL-free
+        worker threads (``-1`` = all CPUs); the inserts themselves stay a
+        single-threaded ``executemany``.
+        """
+        if threads:
+            pairs = list(pairs)
+            blobs = self.compressor.compress_batch([v for _, v in pairs], threads=threads)
+            rows = zip((k for k, _ in pairs), blobs)
+        else:
+            compress = self.compressor.compress
+            rows = ((k, compress(v)) for k, v in pairs)
+        with self.transaction():
+            with self._executemany(STORE_KV, rows):
+                pass
+
+    def clear(self):
+        """Remove every key by recreating the ``Dict`` table.
+
+        ``MutableMapping.clear`` would ``popitem`` one row at a time; even a
+        single ``DELETE FROM Dict`` journals every page. Dropping and
+        rebuilding the table is a schema edit whose cost does not grow with
+        the table. The ``Zstd`` dictionary is kept.
+        """
+        with self.transaction():
+            self._execute_write("DROP TABLE IF EXISTS Dict")
+            self._execute_write(BUILD_TABLE)
+
     def optimize_database(self):
         # Read once, keep (key, decompressed_value) in memory so we don't
         # iterate the table twice.
@@ -217,19 +349,25 @@ class _Database(MutableMapping):
         samples = [v for _, v in pairs]
 
         zstd_dict = ZstdCompressor.optimize_dict(samples)
-        self.compressor = ZstdCompressor(zstd_dict=zstd_dict)
+        self.compressor = ZstdCompressor(level=self.compress_level, zstd_dict=zstd_dict)
 
-        compressed = [(k, self.compressor.compress(v)) for k, v in pairs]
+        # One batched call into zstd instead of a Python-level loop.
+        blobs = self.compressor.compress_batch(samples, threads=-1)
 
+        # Every row is rewritten anyway, so recreate both tables from the
+        # in-memory copy: this also migrates databases created before the
+        # ``WITHOUT ROWID`` schema.
         with self.transaction():
-            with self._executemany(STORE_KV, compressed):
-                pass
-            with self._execute(STORE_ZSTD, ("dict", zstd_dict)):
+            self._execute_write("DROP TABLE IF EXISTS Dict")
+            self._execute_write(BUILD_TABLE)
+            with self._executemany(STORE_KV, zip((k for k, _ in pairs), blobs)):
                 pass
+            self._execute_write("DROP TABLE IF EXISTS Zstd")
+            self._execute_write(BUILD_ZSTD_TABLE)
+            self._save_zstd_dict(zstd_dict)
 
         # VACUUM cannot run inside an active transaction.
-        with self._execute("VACUUM"):
-            pass
+        self._execute_write("VACUUM")
 
     def close(self):
         if self._cx:
@@ -241,8 +379,16 @@ class _Database(MutableMapping):
             self._cx = None
 
     def keys(self):
-        with self._execute(ITER_KEYS) as cu:
-            return [row[0] for row in cu.fetchall()]
+        if not self._cx:
+            raise error(_ERR_CLOSED)
+        try:
+            cu = self._cx.execute(ITER_KEYS)
+            try:
+                return [key for (key,) in cu.fetchall()]
+            finally:
+                cu.close()
+        except sqlite3.Error as exc:
+            raise error(str(exc))
 
     def __enter__(self):
         self.begin()
@@ -258,7 +404,7 @@ class _Database(MutableMapping):
             self.close()
 
 
-def open(filename, /, flag="r", mode=0o666, sqlite3_kargs={}):
+def open(filename, /, flag="r", mode=0o666, sqlite3_kargs={}, pragmas=None, compress_level=3):
     """Open a dbm.sqlite3 database and return the dbm object.
 
     The 'filename' parameter is the name of the database file.
@@ -271,5 +417,13 @@ def open(filename, /, flag="r", mode=0o666, sqlite3_kargs={}):
 
     The optional 'mode' parameter is the Unix file access mode of the database;
     only used when creating a new database. Default: 0o666.
+
+    The optional 'pragmas' mapping overrides entries of DEFAULT_PRAGMAS
+    (e.g. ``{"mmap_size": 0, "cache_size": -2000}``); ``None`` skips one.
+
+    The optional 'compress_level' is the zstd level for new writes; higher
+    levels shrink the file but make every write slower. Default: 3.
     """
-    return _Database(filename, flag=flag, mode=mode, sqlite3_kargs=sqlite3_kargs)
+    return _Database(
+        filename, flag=flag, mode=mode, sqlite3_kargs=sqlite3_kargs, pragmas=pragmas, compress_level=compress_level
+    )
@@ -4,25 +4,51 @@
 - Python <  3.14：回退到第三方 ``zstandard`` 库。
 
 两种后端都暴露相同的 ``ZstdCompressor`` 接口（``compress`` / ``decompress``
-/ ``optimize_dict``），使上层代码无需关心具体实现。
+/ ``compress_batch`` / ``optimize_dict``），使上层代码无需关心具体实现。
+
+``raw_threshold`` 大于 0 且没有加载字典时，短于该长度的数据不压缩，而是
+以 ``_RAW_TAG`` 单字节前缀原样存放：zstd 帧头加块头约 10 字节，无字典时
+几十字节的数据基本压不小，反而白花一次编解码。zstd 帧总是以魔数
+``28 B5 2F FD`` 开头，首字节不可能是 ``0x00``，所以旧数据无需迁移即可读。
 """
 
 from __future__ import annotations
 
+import os
 import random
 import sys
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # 训练字典时，采样上限。超过则随机抽样，避免 CPU 爆炸但保持代表性。
 _DICT_TRAIN_SAMPLE_CAP = 100_000
 
 
+_RAW_TAG = b"\x00"
+
+
 def _maybe_sample(samples: list[bytes]) -> list[bytes]:
     if len(samples) > _DICT_TRAIN_SAMPLE_CAP:
         return random.sample(samples, _DICT_TRAIN_SAMPLE_CAP)
     return samples
 
 
+def _batch_with_raw(data: list[bytes], raw_threshold: int, compress_frames) -> list[bytes]:
+    """对 ``data`` 中足够长的条目调用 ``compress_frames`` 批量压缩，其余打原文标记。"""
+    if not raw_threshold:
+        return compress_frames(data)
+    out: list[bytes] = [b""] * len(data)
+    big: list[int] = []
+    for i, d in enumerate(data):
+        if len(d) < raw_threshold:
+            out[i] = _RAW_TAG + d
+        else:
+            big.append(i)
+    for i, blob in zip(big, compress_frames([data[i] for i in big])):
+        out[i] = blob
+    return out
+
+
 if sys.version_info >= (3, 14):
     from compression.zstd import (
         CompressionParameter,
@@ -33,12 +59,17 @@ if sys.version_info >= (3, 14):
     )
 
     class ZstdCompressor:
-        def __init__(self, level: int = 3, zstd_dict: bytes | ZstdDict | None = None):
+        def __init__(self, level: int = 3, zstd_dict: bytes | ZstdDict | None = None, raw_threshold: int = 0):
             self.level = level
+            # 有字典时小数据也能压得很好（这正是训练字典的意义），不走原文路径。
+            self._raw_threshold = raw_threshold if zstd_dict is None else 0
 
             if zstd_dict is not None and not isinstance(zstd_dict, ZstdDict):
                 zstd_dict = ZstdDict(zstd_dict)
             self._zstd_dict = zstd_dict
+            # 压缩端用 digested 形式的字典：加载一次即可被每次压缩复用，
+            # 省掉逐帧重新加载字典的开销；解压仍用原字典。
+            self._compress_dict = None if zstd_dict is None else zstd_dict.as_digested_dict
 
             self._options = {
                 CompressionParameter.compression_level: level,
@@ -55,12 +86,14 @@ if sys.version_info >= (3, 14):
         def _get_compressor(self) -> _StdZstdCompressor:
             c = getattr(self._local, "compressor", None)
             if c is None:
-                c = _StdZstdCompressor(options=self._options, zstd_dict=self._zstd_dict)
+                c = _StdZstdCompressor(options=self._options, zstd_dict=self._compress_dict)
                 self._local.compressor = c
             return c
 
         def compress(self, data: bytes) -> bytes:
-            """一次性压缩 ``data`` 并返回完整 zstd 帧。"""
+            """一次性压缩 ``data`` 并返回完整 zstd 帧（或带标记的原文）。"""
+            if len(data) < self._raw_threshold:
+                return _RAW_TAG + data
             return self._get_compressor().compress(data, _StdZstdCompressor.FLUSH_FRAME)
 
         def decompress(self, data: bytes) -> bytes:
@@ -70,8 +103,26 @@ if sys.version_info >= (3, 14):
             解完后 ``eof`` 为真，继续喂下一帧会抛 ``EOFError``。所以直接用
             模块级的一次性函数，语义最清晰也避免了显式重建。
             """
+            if data[:1] == _RAW_TAG:
+                return data[1:]
             return _zstd_decompress(data, zstd_dict=self._zstd_dict)
 
+        def compress_batch(self, data: list[bytes], threads: int = 0) -> list[bytes]:
+            """批量压缩，返回与 ``data`` 一一对应的 zstd 帧。
+
+            标准库后端没有 ``multi_compress_to_buffer``；``threads`` 非 0 时
+            用线程池分摊（``compression.zstd`` 压缩时会释放 GIL，每个线程
+            走自己的 thread-local compressor），``-1`` 表示使用全部 CPU。
+            """
+            return _batch_with_raw(data, self._raw_threshold, lambda items: self._compress_frames(items, threads))
+
+        def _compress_frames(self, data: list[bytes], threads: int) -> list[bytes]:
+            if not threads or len(data) < 2:
+                return [self.compress(d) for d in data]
+            workers = os.cpu_count() if threads < 0 else threads
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(self.compress, data, chunksize=256))
+
         @staticmethod
         def optimize_dict(samples: list[bytes]) -> bytes:
             samples = _maybe_sample(samples)
@@ -85,13 +136,24 @@ else:
     import zstandard as zstd  # ty: ignore[unresolved-import]
 
     class ZstdCompressor:
-        def __init__(self, level: int = 3, zstd_dict=None):
+        def __init__(self, level: int = 3, zstd_dict=None, raw_threshold: int = 0):
             self.level = level
-
-            if not ((zstd_dict is None) or isinstance(zstd_dict, zstd.ZstdCompressionDict)):
+            # 有字典时小数据也能压得很好（这正是训练字典的意义），不走原文路径。
+            self._raw_threshold = raw_threshold if zstd_dict is None else 0
+
+            if isinstance(zstd_dict, zstd.ZstdCompressionDict):
+                # 调用方传进来的字典对象先复制一份：下面的 ``precompute_compress``
+                # 会原地改写它，别处再拿它压缩就会悄悄沿用这里的级别。
+                zstd_dict = zstd.ZstdCompressionDict(zstd_dict.as_bytes())
+            elif zstd_dict is not None:
                 zstd_dict = zstd.ZstdCompressionDict(zstd_dict)
 
-            compression_params = zstd.ZstdCompressionParameters(write_checksum=False, write_dict_id=False)
+            # 显式传 ``compression_params`` 时 zstandard 会忽略 ``level`` 参数，
+            # 所以必须用 ``from_level`` 把级别也编进参数里，否则级别形同虚设。
+            compression_params = zstd.ZstdCompressionParameters.from_level(level, write_checksum=False, write_dict_id=False)
+            if zstd_dict is not None:
+                # 预先按本级别把字典"消化"好，之后每次 ``compress`` 不用再加载字典。
+                zstd_dict.precompute_compress(compression_params=compression_params)
 
             # zstandard 的 ZstdCompressor/ZstdDecompressor 顶层对象内部
             # 每次 ``compress`` / ``decompress`` 都会重新建 ctx，所以本身
@@ -100,11 +162,34 @@ else:
             self._decompressor = zstd.ZstdDecompressor(dict_data=zstd_dict)
 
         def compress(self, data: bytes) -> bytes:
+            if len(data) < self._raw_threshold:
+                return _RAW_TAG + data
             return self._compressor.compress(data)
 
         def decompress(self, data: bytes) -> bytes:
+            if data[:1] == _RAW_TAG:
+                return data[1:]
             return self._decompressor.decompress(data)
 
+        def compress_batch(self, data: list[bytes], threads: int = 0) -> list[bytes]:
+            """批量压缩，返回与 ``data`` 一一对应的 zstd 帧。
+
+            走 ``multi_compress_to_buffer``：整批数据一次进入 C 扩展，
+            ``threads`` 非 0 时还会在释放 GIL 的工作线程里并行压缩
+            （``-1`` 表示使用全部 CPU）。它不接受空列表 / 空元素，CFFI
+            后端也没有实现，这些情况退回逐条 ``compress``。
+            """
+            return _batch_with_raw(data, self._raw_threshold, lambda items: self._compress_frames(items, threads))
+
+        def _compress_frames(self, data: list[bytes], threads: int) -> list[bytes]:
+            if not data or not all(data):
+                return [self.compress(d) for d in data]
+            try:
+                buffers = self._compressor.multi_compress_to_buffer(data, threads=threads)
+            except NotImplementedError:
+                return [self.compress(d) for d in data]
+            return [segment.tobytes() for segment in buffers]
+
         @staticmethod
         def optimize_dict(samples: list[bytes]) -> bytes:
             samples = _maybe_sample(samples)
@@ -1,3 +1,5 @@
+import pytest
+
 from shelvez import serializer
 
 
@@ -51,3 +53,19 @@ def test_pydantic_serialization():
     for data in data_list:
         ser = serializer.PydanticSerializer(MyModel)
         any_serializer_test(ser, data=data, echo=True)
+
+
+def test_msgspec_serialization():
+    pytest.importorskip("msgspec")
+
+    data_list = [
+        {"key": "value", "key2": "value2"},
+        {"key": [1, 2, 3], "nested": {"a": None, "b": 1.5}},
+        "hello world",
+    ]
+    ser = serializer.MsgspecSerializer()
+    for data in data_list:
+        any_serializer_test(ser, data)
+
+    typed = serializer.MsgspecSerializer(dict[str, int])
+    any_serializer_test(typed, {"a": 1, "b": 2})
@@ -68,6 +68,13 @@ def test_get_default(db_path: str):
         assert db.get("missing", "fallback") == "fallback"
 
 
+def test_get_default_writeback(db_path: str):
+    with shelvez.open(db_path, flag="c", writeback=True) as db:
+        db["pending"] = [1]
+        assert db.get("pending") == [1]
+        assert db.get("missing", "fallback") == "fallback"
+
+
 def test_writeback_buffers_mutations(db_path: str):
     """With ``writeback=True`` in-place mutations of mutable values must be
     flushed back on :meth:`sync` / :meth:`close`."""
@@ -132,3 +139,61 @@ def test_clear(db_path: str):
         db.clear()
         assert len(db) == 0
         assert "a" not in db
+
+
+def test_update_batches_writes(db_path: str):
+    with shelvez.open(db_path, flag="c") as db:
+        db.update({"a": 1, "b": [2]}, c="three")
+        db.update([("d", 4)])
+
+    with shelvez.open(db_path, flag="r") as db:
+        assert dict(db.items()) == {"a": 1, "b": [2], "c": "three", "d": 4}
+
+
+def test_writeback_defers_writes_until_sync(db_path: str):
+    db = shelvez.open(db_path, flag="c", writeback=True)
+    try:
+        db["k"] = "v"
+        assert len(db.dict) == 0  # only buffered in the cache so far
+        assert "k" in db
+        assert len(db) == 1  # len/iter flush pending keys first
+        assert list(db) == ["k"]
+
+        db["only_cached"] = 1
+        del db["only_cached"]
+        assert "only_cached" not in db
+        with pytest.raises(KeyError):
+            del db["only_cached"]
+    finally:
+        db.close()
+
+    with shelvez.open(db_path, flag="r") as db:
+        assert dict(db.items()) == {"k": "v"}
+
+
+def test_getmany(db_path: str):
+    with shelvez.open(db_path, flag="c", writeback=True) as db:
+        db.update({f"k{i}": i for i in range(1500)})
+        db.sync()
+        db["cached"] = "from-cache"
+
+        got = db.getmany(["k0", "k1499", "missing", "cached", "k0"])
+        assert got == {"k0": 0, "k1499": 1499, "cached": "from-cache"}
+        assert db.getmany(f"k{i}" for i in range(1500)) == {f"k{i}": i for i in range(1500)}
+
+
+@pytest.mark.parametrize("writeback", [False, True])
+def test_threaded_batched_writes(db_path: str, writeback: bool):
+    data = {f"k{i}": {"payload": "x" * (i % 200)} for i in range(500)}
+    with shelvez.open(db_path, flag="c", writeback=writeback, threaded=True) as db:
+        db.update(data)
+
+    with shelvez.open(db_path, flag="r") as db:
+        assert dict(db.items()) == data
+
+
+def test_update_after_close_raises(db_path: str):
+    db = shelvez.open(db_path, flag="c")
+    db.close()
+    with pytest.raises(ValueError):
+        db.update({"k": 1})
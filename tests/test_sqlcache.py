@@ -11,9 +11,11 @@ gave every thread its own cache). Those have been removed or rewritten.
 from __future__ import annotations
 
 import concurrent.futures
+import inspect
 import multiprocessing as mp
 import os
 import sqlite3
+import threading
 import time
 
 import pytest
@@ -83,6 +85,207 @@ def test_cache_key_is_args_sensitive(cache_path: str):
     assert calls == 4
 
 
+def test_wrapper_keeps_cache_alive(cache_path: str):
+    import gc
+
+    @sqlcache.lru_cache(cache_path=cache_path, max_size=10)
+    def double(x):
+        return x * 2
+
+    gc.collect()  # the SqlCache instance is only reachable through the wrapper
+    assert double(4) == 8
+    assert double(4) == 8
+
+
+def test_equivalent_calls_share_a_key(cache_path: str):
+    calls = 0
+
+    @sqlcache.ttl_cache(cache_path=cache_path, max_size=50, ttl=10)
+    def scale(x, factor=2):
+        nonlocal calls
+        calls += 1
+        return x * factor
+
+    assert scale(3) == 6
+    assert scale(3, 2) == 6
+    assert scale(3, factor=2) == 6
+    assert scale(x=3) == 6
+    assert calls == 1
+    assert scale(3, factor=5) == 15
+    assert calls == 2
+
+    with pytest.raises(TypeError):
+        scale(3, bogus=1)
+
+
+def test_arg_normalizer_rejects_unsupported_calls():
+    def f(a, /, b, c=3):
+        return a + b + c
+
+    normalize = sqlcache._make_arg_normalizer(f)
+    assert normalize((1, 2), {}) == (1, 2, 3)
+    assert normalize((1,), {"b": 2}) == (1, 2, 3)
+    assert normalize((), {"a": 1, "b": 2}) is None  # positional-only by keyword
+    assert normalize((1, 2), {"b": 2}) is None  # duplicate value
+    assert normalize((1,), {}) is None  # missing argument
+    assert sqlcache._make_arg_normalizer(lambda *args: args) is None
+    assert sqlcache._make_arg_normalizer(lambda *, k: k) is None
+
+
+def test_generated_wrapper_keeps_signature(cache_path: str):
+    calls = []
+
+    @sqlcache.lru_cache(cache_path=cache_path, max_size=10)
+    def f(a, /, b, c=[3]):
+        calls.append((a, b, c))
+        return a + b + c[0]
+
+    assert not f.__code__.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+    assert inspect.signature(f) == inspect.signature(f.__wrapped__)
+    assert f(1, 2) == 6
+    assert f(1, b=2) == f(1, 2, [3]) == 6
+    assert len(calls) == 1
+    with pytest.raises(TypeError, match="test_generated_wrapper_keeps_signature.<locals>.f"):
+        f(a=1, b=2)
+    with pytest.raises(TypeError):
+        f(1)
+
+
+def test_bound_methods_use_the_generic_path(cache_path: str):
+    calls = []
+
+    class Scaler:
+        factor = 10
+
+        def scale(self, x, y=2):
+            calls.append((x, y))
+            return x * y * self.factor
+
+        @classmethod
+        def klass_scale(cls, x, y=2):
+            calls.append((x, y))
+            return x * y * cls.factor
+
+    for method in (Scaler().scale, Scaler.klass_scale):
+        calls.clear()
+        # Bound methods forward the function's ``__code__`` including self/cls.
+        assert sqlcache._make_arg_normalizer(method) is None
+        assert sqlcache._make_fast_wrapper(method) is None
+
+        cached = sqlcache.lru_cache(cache_path=cache_path, max_size=10)(method)
+        assert cached(3, 4) == 120
+        assert cached(3, 4) == 120
+        assert cached(3) == cached(3) == 60
+        assert calls == [(3, 4), (3, 2)]
+
+
+def test_generated_wrapper_keys_match_generic_path(cache_path: str):
+    db = sqlcache._SqlCacheDatabase(cache_path)
+    try:
+        seen = []
+
+        def record(name, args, kwargs):
+            key = db._generate_key(name, args, kwargs)
+            seen.append(key)
+            return key
+
+        def f(x, y=2):
+            return x * y
+
+        wrapped = sqlcache._make_fast_wrapper(
+            f,
+            func=f,
+            name="f",
+            key=record,
+            mget=lambda key, default: default,
+            mset=lambda key, value: None,
+            dget=lambda key, ttl: None,
+            dset=lambda key, value, ttl: None,
+            ttl=None,
+            cleanup=lambda key: None,
+            missing=sqlcache._MISSING,
+            nokw={},
+        )
+        assert wrapped(3, y=2) == 6
+        normalize = sqlcache._make_arg_normalizer(f)
+        assert seen == [db._generate_key("f", normalize((3,), {}), {})]
+        # Parameter names that clash with the generated internals opt out.
+        assert sqlcache._make_fast_wrapper(lambda _sqlcache_k: 0) is None
+    finally:
+        db.close()
+
+
+def test_sharded_cache_persists_across_decorators(cache_path: str):
+    calls = 0
+
+    def _build():
+        cache = sqlcache.SqlCache(cache_path=cache_path, max_size=100, shards=4)
+
+        @cache
+        def f(x):
+            nonlocal calls
+            calls += 1
+            return x * 3
+
+        return cache, f
+
+    cache, f = _build()
+    assert [f(i) for i in range(20)] == [i * 3 for i in range(20)]
+    assert cache.get_stats()["disk_cache"]["total_items"] == 20
+    cache.close()
+    assert all(os.path.exists(f"{cache_path}.{i}") for i in range(4))
+    assert not os.path.exists(cache_path)
+
+    cache, f = _build()
+    try:
+        assert [f(i) for i in range(20)] == [i * 3 for i in range(20)]
+        assert calls == 20
+    finally:
+        cache.close()
+
+
+def test_caches_sharing_a_path_respect_max_size(cache_path: str):
+    caches = [sqlcache.SqlCache(cache_path=cache_path, max_size=5, multiprocess_safe=False) for _ in range(2)]
+    try:
+        first, second = caches[0](lambda x: x), caches[1](lambda x: -x)
+        for i in range(20):
+            first(i)
+            second(i)
+            time.sleep(0.001)
+        assert caches[0].get_stats()["disk_cache"]["total_items"] == 5
+    finally:
+        for cache in caches:
+            cache.close()
+
+
+def test_exclusive_requires_single_process_mode(cache_path: str):
+    with pytest.raises(ValueError):
+        sqlcache.SqlCache(cache_path=cache_path, exclusive=True)
+    cache = sqlcache.SqlCache(cache_path=cache_path, multiprocess_safe=False)
+    try:
+        # Without the explicit promise the in-memory shortcuts stay off.
+        db = cache._db
+        assert db._bloom is None and db._counters is None and db._touches is None
+    finally:
+        cache.close()
+
+
+def test_sharded_miss_trims_only_its_shard(cache_path: str, monkeypatch):
+    cache = sqlcache.SqlCache(cache_path=cache_path, max_size=100, shards=4)
+    try:
+        trimmed = []
+        for shard in cache._db._shards:
+            monkeypatch.setattr(shard, "cleanup_lru", lambda max_size, shard=shard: trimmed.append(shard))
+
+        f = cache(lambda x: x)
+        f(1)
+        assert len(trimmed) == 1
+        cache._db.cleanup_lru(100)
+        assert len(trimmed) == 5
+    finally:
+        cache.close()
+
+
 def test_exception_is_not_cached(cache_path: str):
     calls = 0
 
@@ -169,6 +372,32 @@ def test_clear_evicts_both_tiers(cache_path: str):
     assert calls == 2
 
 
+def test_write_behind_decorator_persists(cache_path: str):
+    calls = 0
+    with sqlcache.SqlCache(cache_path=cache_path, max_size=10, write_behind=True) as cache:
+
+        @cache
+        def square(x):
+            nonlocal calls
+            calls += 1
+            return x * x
+
+        assert [square(i) for i in range(5)] == [0, 1, 4, 9, 16]
+        cache.flush()
+        assert cache.get_stats()["disk_cache"]["total_items"] == 5
+
+    with sqlcache.SqlCache(cache_path=cache_path, max_size=10) as cache:
+
+        @cache
+        def square(x):
+            nonlocal calls
+            calls += 1
+            return -1
+
+        assert square(3) == 9
+    assert calls == 5
+
+
 def test_get_stats_shape(cache_path: str):
     cache = sqlcache.SqlCache(cache_path=cache_path, max_size=10, ttl=10, cache_type="ttl")
 
@@ -192,6 +421,77 @@ def test_invalid_cache_type_rejected(cache_path: str):
         sqlcache.SqlCache(cache_path=cache_path, cache_type="invalid")
 
 
+def test_memory_lru_get_refreshes_recency():
+    cache = sqlcache._LRUCache(maxsize=2)
+    cache["a"] = None
+    cache["b"] = 2
+    assert cache.get("a", "miss") is None  # None is a real cached value
+    cache["c"] = 3  # evicts "b", since "a" was just used
+    assert cache.get("b", "miss") == "miss"
+    assert cache.get("a", "miss") is None
+
+
+def test_memory_ttl_get_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(sqlcache.time, "monotonic", lambda: now[0])
+    cache = sqlcache._TTLCache(maxsize=4, ttl=10)
+    cache["a"] = 1
+    assert cache.get("a") == 1
+    now[0] += 11
+    assert cache.get("a", "miss") == "miss"
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "factory",
+    [
+        lambda: sqlcache._LRUCache(maxsize=8),
+        lambda: sqlcache._TTLCache(maxsize=8, ttl=60),
+        lambda: sqlcache._TinyLFUCache(maxsize=8),
+    ],
+)
+def test_memory_cache_is_threadsafe(factory):
+    cache = factory()
+
+    def worker(seed: int):
+        for i in range(2000):
+            k = (seed * 7 + i) % 32
+            if cache.get(k, sqlcache._MISSING) is sqlcache._MISSING:
+                cache[k] = k
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        for f in [pool.submit(worker, n) for n in range(8)]:
+            f.result(timeout=30)
+    assert len(cache) <= 8
+
+
+def test_memory_tinylfu_resists_scan():
+    cache = sqlcache._TinyLFUCache(maxsize=4)
+    hot = ["h0", "h1", "h2", "h3"]
+    for _ in range(5):
+        for k in hot:
+            if cache.get(k, sqlcache._MISSING) is sqlcache._MISSING:
+                cache[k] = k
+    for i in range(100):  # one-off scan: every key is seen once
+        k = f"cold{i}"
+        assert cache.get(k, "miss") == "miss"
+        cache[k] = k
+    assert all(cache.get(k) == k for k in hot)
+    assert len(cache) == 4
+
+
+def test_tinylfu_option_selects_admission_cache(cache_path: str):
+    with sqlcache.SqlCache(cache_path=cache_path, max_size=8, tinylfu=True) as cache:
+        assert isinstance(cache._memory_cache, sqlcache._TinyLFUCache)
+
+        @cache
+        def double(x):
+            return x * 2
+
+        assert [double(i) for i in range(20)] == [i * 2 for i in range(20)]
+        assert len(cache._memory_cache) <= 8
+
+
 # ---------------------------------------------------------------------------
 # Internal database primitive
 # ---------------------------------------------------------------------------
@@ -220,6 +520,317 @@ class TestSqlCacheDatabase:
         finally:
             db.close()
 
+    @pytest.mark.parametrize("multiprocess_safe", [True, False])
+    def test_connection_pragmas(self, cache_path: str, multiprocess_safe: bool):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=multiprocess_safe)
+        try:
+            cx = db._db._cx
+            assert cx.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert cx.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            busy_timeout = cx.execute("PRAGMA busy_timeout").fetchone()[0]
+            assert busy_timeout == (30000 if multiprocess_safe else 5000)
+            assert cx.execute("PRAGMA cache_spill").fetchone()[0] == 0
+        finally:
+            db.close()
+
+    def test_pragmas_override(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, pragmas={"journal_mode": "memory"})
+        try:
+            assert db._db._cx.execute("PRAGMA journal_mode").fetchone()[0] == "memory"
+            db.set("k", "v")
+            assert db.get("k") == "v"
+        finally:
+            db.close()
+
+    def test_set_ttl_sets_expires_at(self, cache_path: str, monkeypatch):
+        now = [1_000_000_000_000]
+        monkeypatch.setattr(sqlcache.time, "time_ns", lambda: now[0])
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            db.set("short", "s", ttl=5)
+            db.set("forever", "f")
+            assert db.get("short") == "s"
+            now[0] += 6_000_000_000
+            assert db.get("short") is None
+            assert db.get("forever") == "f"
+
+            db.cleanup_expired()
+            with db._execute("SELECT COUNT(*) FROM cache") as cur:
+                assert cur.fetchone()[0] == 1
+        finally:
+            db.close()
+
+    def test_migrates_legacy_real_seconds_table(self, cache_path: str, monkeypatch):
+        import pickle
+
+        from shelvez.zstd import ZstdCompressor
+
+        # Keep sampled access updates from moving last_access during the test.
+        monkeypatch.setattr(sqlcache, "_ACCESS_UPDATE_SAMPLE_RATE", 0.0)
+        legacy_time = time.time() - 10
+        cx = sqlite3.connect(cache_path)
+        try:
+            cx.execute(
+                "CREATE TABLE cache (key BLOB UNIQUE NOT NULL PRIMARY KEY, value BLOB NOT NULL, "
+                "created_at REAL NOT NULL, access_count INTEGER DEFAULT 0, last_access REAL NOT NULL)"
+            )
+            cx.execute(
+                "INSERT INTO cache VALUES (?, ?, ?, 3, ?)",
+                ("old", ZstdCompressor().compress(pickle.dumps("legacy", protocol=5)), legacy_time, legacy_time),
+            )
+            cx.commit()
+        finally:
+            cx.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            columns = db._cache_columns()
+            assert columns["created_at"] == columns["last_access"] == columns["expires_at"] == "INTEGER"
+            assert db.get("old") == "legacy"
+            assert db.get("old", ttl=60) == "legacy"
+            assert db.get("old", ttl=5) is None
+            assert db.get_stats()["last_access"] == pytest.approx(legacy_time, abs=0.01)
+            db.set("k", "v", ttl=60)
+            assert db.get("k") == "v"
+        finally:
+            db.close()
+
+        cx = sqlite3.connect(cache_path)
+        try:
+            assert cx.execute("PRAGMA user_version").fetchone()[0] == sqlcache._SqlCacheDatabase.SCHEMA_VERSION
+            indexes = {row[0] for row in cx.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+            assert {"idx_created_at", "idx_last_access", "idx_expires_at"} <= indexes
+        finally:
+            cx.close()
+
+        # Re-opening an already migrated cache must not rescale timestamps again.
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            assert db.get("old", ttl=60) == "legacy"
+        finally:
+            db.close()
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = sqlcache._BloomFilter(1000)
+        keys = [os.urandom(16) for _ in range(1000)]
+        for k in keys:
+            bloom.add(k)
+        assert all(k in bloom for k in keys)
+        assert not bloom.saturated
+        false_positives = sum(os.urandom(16) in bloom for _ in range(10_000))
+        assert false_positives < 500
+        bloom.add(b"one more")
+        assert bloom.saturated
+
+    def test_bloom_skips_sqlite_for_absent_keys(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            db.set("k", "v")
+            executed = []
+            real = db._db._cx
+
+            def counting_execute(sql, params=()):
+                executed.append(sql)
+                return real.execute(sql, params)
+
+            original = _install_proxy_cx(db, counting_execute)
+            try:
+                assert db.get("missing") is None
+                assert executed == []
+                assert db.get("k") == "v"
+                assert executed
+            finally:
+                db._db._cx = original
+
+            db.clear()
+            assert db.get("k") is None
+        finally:
+            db.close()
+
+    def test_bloom_is_seeded_from_existing_rows(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(sqlcache, "_BLOOM_MIN_CAPACITY", 4)
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            for i in range(20):  # crosses the capacity several times -> rebuilds
+                db.set(f"k{i}", i)
+            assert [db.get(f"k{i}") for i in range(20)] == list(range(20))
+        finally:
+            db.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            assert db.get("k7") == 7
+        finally:
+            db.close()
+
+    def test_optimize_compression_trains_dict(self, cache_path: str):
+        values = {f"k{i}": {"user": f"user-{i}", "scores": list(range(i % 40)), "tag": "shared"} for i in range(400)}
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        other = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            for k, v in values.items():
+                db.set(k, v)
+            with db._execute("SELECT SUM(LENGTH(value)) FROM cache") as cur:
+                before = cur.fetchone()[0]
+
+            db.optimize_compression()
+
+            with db._execute("SELECT SUM(LENGTH(value)) FROM cache") as cur:
+                assert cur.fetchone()[0] < before
+            assert all(db.get(k) == v for k, v in values.items())
+            # A connection opened before the dictionary existed picks it up lazily.
+            assert other.get("k7") == values["k7"]
+        finally:
+            other.close()
+            db.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            assert db.get("k123") == values["k123"]
+        finally:
+            db.close()
+
+    @pytest.mark.parametrize("multiprocess_safe", [True, False])
+    def test_write_behind_batches_and_reads_own_writes(self, cache_path: str, multiprocess_safe: bool):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=multiprocess_safe, write_behind=True)
+        try:
+            for i in range(50):
+                db.set(f"k{i}", i)
+            # Visible in-process immediately, whether or not it has been committed yet.
+            assert [db.get(f"k{i}") for i in range(50)] == list(range(50))
+            db.cleanup_lru(40)
+            db.flush()
+
+            cx = sqlite3.connect(cache_path)
+            try:
+                assert cx.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 40
+            finally:
+                cx.close()
+
+            db.set("gone", 1)
+            db.delete("gone")
+            db.flush()
+            assert db.get("gone") is None
+        finally:
+            db.close()
+
+        # Using the database after close() transparently reopens it.
+        try:
+            db.set("after-close", 1)
+            assert db.get("after-close") == 1
+            assert db.get("k0") is None and db.get("k49") == 49
+        finally:
+            db.close()
+
+    def test_write_behind_cleanup_lru_trims_past_one_chunk(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, write_behind=True)
+        try:
+            for i in range(2000):
+                db.set(f"k{i}", i)
+            db.flush()
+            db.cleanup_lru(100)
+            db.flush()
+            with db._execute(sqlcache._COUNT_SQL) as cur:
+                assert cur.fetchone()[0] == 100
+        finally:
+            db.close()
+
+    def test_write_behind_retries_once_then_warns(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, write_behind=True, pragmas={"busy_timeout": 300})
+        holder = sqlite3.connect(cache_path, isolation_level=None, check_same_thread=False)
+        try:
+            # Released while the writer waits on its retry: the batch lands.
+            holder.execute("BEGIN IMMEDIATE")
+            threading.Timer(0.45, holder.execute, ("ROLLBACK",)).start()
+            db.set("retried", 1)
+            db.flush()
+
+            # Held past both attempts: the batch is dropped with a warning.
+            holder.execute("BEGIN IMMEDIATE")
+            db.set("dropped", 1)
+            with pytest.warns(RuntimeWarning, match="sqlcache"):
+                db.flush()
+            holder.execute("ROLLBACK")
+            assert db.get("dropped") is None
+        finally:
+            holder.close()
+            db.close()
+
+        cx = sqlite3.connect(cache_path)
+        try:
+            assert cx.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 1
+        finally:
+            cx.close()
+
+    def test_write_behind_close_flushes(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, write_behind=True)
+        db.set("k", "v", ttl=60)
+        db.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            assert db.get("k") == "v"
+        finally:
+            db.close()
+
+    def test_sampled_hit_updates_access(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(sqlcache, "_ACCESS_UPDATE_SAMPLE_RATE", 1.0)
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            db.set("k", "v")
+            assert db.get("k") == "v"
+            assert db.get("k", ttl=10) == "v"
+            time.sleep(0.06)
+            assert db.get("k", ttl=0.05) is None
+            assert db.get("missing") is None
+        finally:
+            db.close()
+
+        # The touch must be committed, i.e. visible to another connection.
+        cx = sqlite3.connect(cache_path)
+        try:
+            assert cx.execute("SELECT access_count FROM cache").fetchone()[0] == 3
+        finally:
+            cx.close()
+
+    def test_sampled_lookup_only_writes_on_a_hit(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(sqlcache, "_ACCESS_UPDATE_SAMPLE_RATE", 1.0)
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            db.set("k", "v")
+            executed = []
+            real = db._db._cx
+
+            def counting_execute(sql, params=()):
+                executed.append(sql)
+                return real.execute(sql, params)
+
+            original = _install_proxy_cx(db, counting_execute)
+            try:
+                assert db.get("k") == "v"
+                assert executed == [sqlcache._GET_SQL, sqlcache._TOUCH_SQL]
+                executed.clear()
+                assert db.get("missing") is None
+                assert executed == [sqlcache._GET_SQL]
+            finally:
+                db._db._cx = original
+        finally:
+            db.close()
+
+    def test_sampled_miss_does_not_wait_for_writers(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(sqlcache, "_ACCESS_UPDATE_SAMPLE_RATE", 1.0)
+        db = sqlcache._SqlCacheDatabase(cache_path, pragmas={"busy_timeout": 500})
+        holder = sqlite3.connect(cache_path, isolation_level=None)
+        try:
+            holder.execute("BEGIN IMMEDIATE")
+            start = time.monotonic()
+            assert db.get("missing") is None
+            assert time.monotonic() - start < 0.25
+        finally:
+            holder.execute("ROLLBACK")
+            holder.close()
+            db.close()
+
     def test_cleanup_lru_keeps_most_recent(self, cache_path: str):
         db = sqlcache._SqlCacheDatabase(cache_path)
         try:
@@ -240,6 +851,209 @@ class TestSqlCacheDatabase:
         finally:
             db.close()
 
+    def test_cleanup_lru_deletes_in_chunks(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(sqlcache, "_CLEANUP_CHUNK_ROWS", 2)
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            for i in range(10):
+                db.set(f"k{i}", i)
+                time.sleep(0.002)
+
+            db.cleanup_lru(3)
+
+            with db._execute("SELECT COUNT(*) FROM cache") as cur:
+                assert cur.fetchone()[0] == 3
+            assert [db.get(f"k{i}") for i in range(6, 10)] == [None, 7, 8, 9]
+        finally:
+            db.close()
+
+    @pytest.mark.parametrize("has_returning", [True, False])
+    def test_incremental_stats_match_table(self, cache_path: str, monkeypatch, has_returning: bool):
+        monkeypatch.setattr(sqlcache, "_HAS_RETURNING", has_returning)
+        monkeypatch.setattr(sqlcache, "_ACCESS_UPDATE_SAMPLE_RATE", 1.0)
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            for i in range(6):
+                db.set(f"k{i}", i)
+            db.set("k0", "replaced")
+            db.get("k1")
+            db.delete("k2")
+            db.delete("missing")
+            db.cleanup_lru(4)
+
+            stats = db.get_stats()
+            with db._execute("SELECT COUNT(*), AVG(access_count) FROM cache") as cur:
+                count, avg = cur.fetchone()
+            assert db._counters[0] == count == 4
+            assert stats["total_items"] == count
+            assert stats["avg_access_count"] == pytest.approx(avg)
+
+            db.clear()
+            assert db.get_stats()["total_items"] == 0
+        finally:
+            db.close()
+
+    def test_incremental_stats_seeded_from_existing_rows(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        for i in range(5):
+            db.set(f"k{i}", i)
+        db.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            assert db._counters == [5, 5]
+            assert db.get_stats()["total_items"] == 5
+        finally:
+            db.close()
+
+    def test_sole_owner_hits_do_not_write(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            db.set("k", 1)
+            changes = db._db._cx.total_changes
+            for _ in range(50):
+                assert db.get("k") == 1
+            assert db._db._cx.total_changes == changes
+            assert db._touches["k"][1] == 50
+        finally:
+            db.close()
+
+    def test_sole_owner_cleanup_lru_honours_buffered_hits(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            for i in range(5):
+                db.set(f"k{i}", i)
+                time.sleep(0.002)
+            time.sleep(0.002)
+            # k0 是最早写入的，但刚被读过，淘汰时应当留下。
+            assert db.get("k0") == 0
+
+            db.cleanup_lru(2)
+
+            assert db._touches == {}
+            assert db.get("k0") == 0
+            assert db.get("k4") == 4
+            assert [db.get(f"k{i}") for i in range(1, 4)] == [None, None, None]
+        finally:
+            db.close()
+
+    def test_sole_owner_close_persists_hits(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        db.set("k", 1)
+        for _ in range(3):
+            db.get("k")
+        db.close()
+
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            with db._execute("SELECT access_count FROM cache WHERE key = ?", ("k",)) as cur:
+                assert cur.fetchone()[0] == 4
+        finally:
+            db.close()
+
+    def test_sharded_routes_and_aggregates(self, cache_path: str):
+        db = sqlcache._ShardedSqlCacheDatabase(cache_path, 4, multiprocess_safe=False, exclusive=True)
+        try:
+            keys = [db._generate_key("f", (i,), {}) for i in range(200)]
+            for i, key in enumerate(keys):
+                db.set(key, i)
+            db.set("plain", "str keys route too")
+
+            assert [db.get(key) for key in keys] == list(range(200))
+            assert db.get("plain") == "str keys route too"
+            sizes = [shard.get_stats()["total_items"] for shard in db._shards]
+            assert sum(sizes) == 201 and min(sizes) > 0
+            assert db.get_stats()["total_items"] == 201
+
+            db.cleanup_lru(40)
+            sizes = [shard.get_stats()["total_items"] for shard in db._shards]
+            assert max(sizes) <= 10
+
+            # Per-write trimming only visits the shard that owns the key.
+            owner = db._shard(keys[0])
+            for i in range(20):
+                db.set(db._generate_key("g", (i,), {}), i)
+            before = [shard.get_stats()["total_items"] for shard in db._shards]
+            db.cleanup_lru_for(keys[0], 8)
+            after = [shard.get_stats()["total_items"] for shard in db._shards]
+            for shard, n_before, n_after in zip(db._shards, before, after):
+                assert n_after == (min(n_before, 2) if shard is owner else n_before)
+
+            db.delete(keys[-1])
+            db.clear()
+            assert db.get_stats()["total_items"] == 0
+        finally:
+            db.close()
+
+    def test_sharded_auto_count_is_clamped(self, cache_path: str, monkeypatch):
+        monkeypatch.setattr(os, "cpu_count", lambda: 64)
+        db = sqlcache._ShardedSqlCacheDatabase(cache_path, -1)
+        try:
+            assert len(db._shards) == sqlcache._MAX_AUTO_SHARDS
+        finally:
+            db.close()
+        with pytest.raises(ValueError):
+            sqlcache._ShardedSqlCacheDatabase(cache_path, 0)
+
+    def test_buffered_hits_update_under_the_lock(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, write_behind=True, exclusive=True)
+        try:
+            db.set("k", 1)
+            db.flush()
+            selected, resume = threading.Event(), threading.Event()
+            select_value = db._select_value
+
+            def paused_select(*args):
+                row = select_value(*args)
+                selected.set()
+                resume.wait(5)
+                return row
+
+            db._select_value = paused_select
+            reader = threading.Thread(target=db.get, args=("k",))
+            reader.start()
+            assert selected.wait(5)
+            # While another thread holds the lock (as _flush_touches does while
+            # iterating the buffer), the reader must not touch the buffer.
+            with db._lock:
+                resume.set()
+                reader.join(0.1)
+                assert db._touches == {}
+            reader.join(5)
+            assert db._touches["k"][1] == 1
+        finally:
+            db.close()
+
+    def test_exclusive_state_survives_reopen(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False, exclusive=True)
+        try:
+            db.set("a", 1)
+            db.close()
+            db.set("b", 2)  # reopens the connection inside set()
+            assert db.get_stats()["total_items"] == 2
+            db.close()
+            assert db.get("a") == 1  # reopens inside get(); the hit is buffered
+            assert db._touches["a"][1] == 1
+            db.close()
+            with db._execute("SELECT access_count FROM cache WHERE key = ?", ("a",)) as cur:
+                assert cur.fetchone()[0] == 2
+        finally:
+            db.close()
+
+    def test_generate_key_is_stable_and_arg_sensitive(self, cache_path: str):
+        db = sqlcache._SqlCacheDatabase(cache_path)
+        try:
+            key = db._generate_key("f", (1, "a"), {"b": None})
+            assert isinstance(key, bytes) and len(key) == 16
+            assert key == db._generate_key("f", (1, "a"), {"b": None})
+            assert key != db._generate_key("f", (1, "a"), {"b": 0})
+            assert key != db._generate_key("g", (1, "a"), {"b": None})
+            # Non-scalar arguments take the pickle path but stay deterministic.
+            assert db._generate_key("f", ([1, 2],), {}) == db._generate_key("f", ([1, 2],), {})
+            assert db._generate_key("f", ([1, 2],), {}) != db._generate_key("f", ([1, 3],), {})
+        finally:
+            db.close()
+
     def test_clear_removes_all(self, cache_path: str):
         db = sqlcache._SqlCacheDatabase(cache_path)
         try:
@@ -248,6 +1062,10 @@ class TestSqlCacheDatabase:
             db.clear()
             assert db.get("k1") is None
             assert db.get("k2") is None
+            with db._execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'cache'") as cur:
+                assert {row[0] for row in cur.fetchall()} >= {"idx_created_at", "idx_last_access", "idx_expires_at"}
+            db.set("k1", 3)
+            assert db.get("k1") == 3
         finally:
             db.close()
 
@@ -316,38 +1134,26 @@ def _install_proxy_cx(db, execute):
     return original
 
 
-def test_execute_retries_on_database_locked(cache_path: str, monkeypatch):
-    """When ``multiprocess_safe=True`` a transient ``database is locked`` must
-    be retried with exponential backoff instead of surfacing to the caller."""
-    monkeypatch.setattr(sqlcache.time, "sleep", lambda *_: None)
-
+def test_execute_waits_for_lock_via_busy_timeout(cache_path: str):
+    """A writer holding the lock briefly must not make ``set`` fail: SQLite's
+    ``busy_timeout`` parks the call until the lock is released."""
     db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=True)
+    holder = sqlite3.connect(cache_path, isolation_level=None, check_same_thread=False)
     try:
-        attempts = {"n": 0}
-        assert db._db._cx is not None
-        real_execute = db._db._cx.execute
-
-        def flaky(sql, params=()):
-            attempts["n"] += 1
-            if attempts["n"] < 3:
-                raise sqlite3.OperationalError("database is locked")
-            return real_execute(sql, params)
-
-        original = _install_proxy_cx(db, flaky)
-        try:
-            db.set("k", "v")
-            assert attempts["n"] == 3
-        finally:
-            db._db._cx = original
-
+        holder.execute("BEGIN IMMEDIATE")
+        release = threading.Timer(0.2, holder.execute, args=("COMMIT",))
+        release.start()
+        start = time.monotonic()
+        db.set("k", "v")
+        assert time.monotonic() - start >= 0.15
+        release.join()
         assert db.get("k") == "v"
     finally:
+        holder.close()
         db.close()
 
 
-def test_execute_raises_sqlcacheerror_when_retries_exhausted(cache_path: str, monkeypatch):
-    monkeypatch.setattr(sqlcache.time, "sleep", lambda *_: None)
-
+def test_execute_raises_sqlcacheerror_on_lock_timeout(cache_path: str):
     db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=True)
     try:
 
@@ -400,10 +1206,11 @@ def test_execute_wraps_generic_sqlite_error(cache_path: str):
         db.close()
 
 
-def test_non_multiprocess_does_not_retry(cache_path: str):
-    """With ``multiprocess_safe=False`` a lock error must be raised on the
-    first attempt (``max_retries`` collapses to 1)."""
-    db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=False)
+@pytest.mark.parametrize("multiprocess_safe", [True, False])
+def test_lock_error_is_not_retried_in_python(cache_path: str, multiprocess_safe: bool):
+    """Waiting is SQLite's ``busy_timeout``'s job: once a lock error reaches
+    Python it is raised on the first attempt, in both modes."""
+    db = sqlcache._SqlCacheDatabase(cache_path, multiprocess_safe=multiprocess_safe)
     try:
         attempts = {"n": 0}
 
@@ -451,6 +1258,29 @@ def test_close_is_idempotent(cache_path: str):
     cache.close()  # must not raise
 
 
+def test_wrapper_reconnects_after_close(cache_path: str):
+    calls = 0
+    cache = sqlcache.SqlCache(cache_path=cache_path, max_size=4)
+
+    @cache
+    def f(x):
+        nonlocal calls
+        calls += 1
+        return x + 1
+
+    assert f(1) == 2
+    cache.close()
+    cache._memory_cache.clear()
+    try:
+        assert f(1) == 2  # served from disk through a reopened connection
+        assert f(2) == 3
+        assert calls == 2
+        assert cache._db._db._cx is not None
+    finally:
+        cache.close()
+    assert cache._db._db._cx is None
+
+
 def test_multiprocess_shared_cache(cache_path: str):
     """Two independent processes hitting the same ``cache_path`` must both
     observe a consistent cache without crashing or corrupting the DB."""
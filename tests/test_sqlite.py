@@ -118,6 +118,13 @@ class TestMapping:
         finally:
             db.close()
 
+    def test_get_default(self, db_path: str):
+        with _open(db_path, flag="c") as db:
+            db["k"] = _dumps(1)
+            assert db.get("k") == _dumps(1)
+            assert db.get("nope") is None
+            assert db.get("nope", b"fallback") == b"fallback"
+
     def test_delete(self, db_path: str):
         db = _open(db_path, flag="c")
         try:
@@ -141,6 +148,31 @@ class TestMapping:
         finally:
             db.close()
 
+    def test_iter_spans_fetch_batches(self, db_path: str, monkeypatch):
+        monkeypatch.setattr(shelvez_sqlite, "_ITER_BATCH", 3)
+        db = _open(db_path, flag="c")
+        try:
+            db.update({f"k{i}": _dumps(i) for i in range(10)})
+            assert sorted(db) == sorted(f"k{i}" for i in range(10))
+        finally:
+            db.close()
+
+    def test_clear(self, db_path: str):
+        db = _open(db_path, flag="c")
+        try:
+            db.update({f"k{i}": _dumps(i) for i in range(10)})
+            db.clear()
+            assert len(db) == 0
+            db["k"] = _dumps("v")
+            assert db["k"] == _dumps("v")
+            # Inside an open transaction the clear joins it and can be undone.
+            db.begin()
+            db.clear()
+            db.rollback()
+            assert db["k"] == _dumps("v")
+        finally:
+            db.close()
+
     def test_context_manager_closes(self, db_path: str):
         with _open(db_path, flag="c") as db:
             db["k"] = _dumps("v")
@@ -170,6 +202,20 @@ class TestCompression:
         assert raw != payload
         assert len(raw) < len(payload)
 
+    def test_small_values_stored_raw(self, db_path: str):
+        import sqlite3
+
+        with _open(db_path, flag="c") as db:
+            db["small"] = b"tiny"
+            assert db["small"] == b"tiny"
+
+        cx = sqlite3.connect(db_path)
+        try:
+            raw = cx.execute("SELECT value FROM Dict WHERE key = ?", ("small",)).fetchone()[0]
+        finally:
+            cx.close()
+        assert raw == b"\x00tiny"
+
 
 class TestOptimizeDatabase:
     def test_optimize_trains_dict_and_keeps_values(self, db_path: str):
@@ -186,6 +232,16 @@ class TestOptimizeDatabase:
         finally:
             db.close()
 
+    def test_optimize_keeps_compress_level(self, db_path: str):
+        db = shelvez_sqlite.open(db_path, flag="c", sqlite3_kargs={"autocommit": True}, compress_level=9)
+        try:
+            for i in range(200):
+                db[f"k{i}"] = _dumps({"user": "alice", "n": i})
+            db.optimize_database()
+            assert db.compressor.level == 9
+        finally:
+            db.close()
+
     def test_trained_dict_persists_across_reopen(self, db_path: str):
         db = _open(db_path, flag="c")
         try:
@@ -206,6 +262,51 @@ class TestOptimizeDatabase:
             db2.close()
 
 
+class TestSchema:
+    @staticmethod
+    def _table_sql(path: str, name: str) -> str:
+        import sqlite3
+
+        cx = sqlite3.connect(path)
+        try:
+            return cx.execute("SELECT sql FROM sqlite_master WHERE name = ?", (name,)).fetchone()[0]
+        finally:
+            cx.close()
+
+    def test_new_tables_are_without_rowid(self, db_path: str):
+        _open(db_path, flag="c").close()
+        assert "WITHOUT ROWID" in self._table_sql(db_path, "Dict")
+        assert "WITHOUT ROWID" in self._table_sql(db_path, "Zstd")
+
+    def test_optimize_migrates_legacy_rowid_tables(self, db_path: str):
+        import sqlite3
+
+        from shelvez.zstd import ZstdCompressor
+
+        compressor = ZstdCompressor()
+        originals = {f"k{i}": _dumps({"user": "alice", "n": i}) for i in range(200)}
+        cx = sqlite3.connect(db_path)
+        try:
+            cx.execute("CREATE TABLE Dict (key TEXT UNIQUE NOT NULL PRIMARY KEY, value BLOB NOT NULL)")
+            cx.execute("CREATE TABLE Zstd (key TEXT UNIQUE NOT NULL, value BLOB NOT NULL)")
+            cx.executemany("INSERT INTO Dict VALUES (?, ?)", [(k, compressor.compress(v)) for k, v in originals.items()])
+            cx.commit()
+        finally:
+            cx.close()
+
+        db = _open(db_path, flag="w")
+        assert db["k7"] == originals["k7"]
+        db.optimize_database()
+        assert {k: db[k] for k in db} == originals
+        db.close()
+
+        assert "WITHOUT ROWID" in self._table_sql(db_path, "Dict")
+        assert "WITHOUT ROWID" in self._table_sql(db_path, "Zstd")
+        db = _open(db_path, flag="r")
+        assert {k: db[k] for k in db} == originals
+        db.close()
+
+
 class TestClose:
     def test_operations_after_close_raise(self, db_path: str):
         db = _open(db_path, flag="c")
@@ -219,3 +320,61 @@ class TestClose:
         db = _open(db_path, flag="c")
         db.close()
         db.close()
+
+
+class TestUpdate:
+    def test_update_roundtrip(self, db_path: str):
+        with _open(db_path, flag="c") as db:
+            db.update({"a": _dumps(1)}, b=_dumps(2))
+            db.update([("c", _dumps(3))])
+
+        with _open(db_path, flag="r") as db:
+            assert {k: db[k] for k in db} == {"a": _dumps(1), "b": _dumps(2), "c": _dumps(3)}
+
+    def test_update_is_atomic(self, db_path: str):
+        def rows():
+            yield "a", _dumps(1)
+            raise RuntimeError("boom")
+
+        db = _open(db_path, flag="c")
+        try:
+            with pytest.raises(RuntimeError):
+                db.update(rows())
+            assert len(db) == 0
+        finally:
+            db.close()
+
+    def test_update_joins_outer_transaction(self, db_path: str):
+        db = _open(db_path, flag="c")
+        try:
+            with pytest.raises(RuntimeError):
+                with db.transaction():
+                    db.update({"a": _dumps(1)})
+                    raise RuntimeError("rollback everything")
+            assert "a" not in db
+        finally:
+            db.close()
+
+
+class TestPragmas:
+    def _pragma(self, db, name):
+        return db._cx.execute(f"PRAGMA {name}").fetchone()[0]
+
+    def test_defaults_applied(self, db_path: str):
+        with _open(db_path, flag="c") as db:
+            assert self._pragma(db, "journal_mode") == "wal"
+            assert self._pragma(db, "page_size") == shelvez_sqlite.DEFAULT_PRAGMAS["page_size"]
+            assert self._pragma(db, "cache_size") == shelvez_sqlite.DEFAULT_PRAGMAS["cache_size"]
+
+    def test_overrides_and_skip(self, db_path: str):
+        db = shelvez_sqlite.open(
+            db_path,
+            flag="c",
+            sqlite3_kargs={"autocommit": True},
+            pragmas={"cache_size": -1000, "mmap_size": None},
+        )
+        try:
+            assert self._pragma(db, "cache_size") == -1000
+            assert self._pragma(db, "mmap_size") != shelvez_sqlite.DEFAULT_PRAGMAS["mmap_size"]
+        finally:
+            db.close()
@@ -10,6 +10,8 @@ and ``optimize_dict``.
 from __future__ import annotations
 
 import os
+import random
+import sys
 
 import pytest
 
@@ -46,6 +48,16 @@ class TestRoundtrip:
         payload = b"abc" * 500
         assert compressor.decompress(compressor.compress(payload)) == payload
 
+    def test_level_affects_output(self):
+        """Regression: the zstandard backend used to ignore ``level`` because
+        explicit ``compression_params`` override it."""
+        rng = random.Random(1)
+        words = ["".join(rng.choice("abcdefghij") for _ in range(rng.randint(2, 8))) for _ in range(3000)]
+        payload = " ".join(rng.choice(words) for _ in range(50_000)).encode()
+        fast = ZstdCompressor(level=1).compress(payload)
+        small = ZstdCompressor(level=19).compress(payload)
+        assert len(small) < len(fast)
+
 
 class TestDictionary:
     def test_optimize_dict_returns_bytes(self, samples):
@@ -82,3 +94,62 @@ class TestDictionary:
         reader = ZstdCompressor(zstd_dict=zdict)
         for original, blob in zip(samples[:10], blobs):
             assert reader.decompress(blob) == original
+
+    @pytest.mark.skipif(sys.version_info >= (3, 14), reason="zstandard backend only")
+    def test_caller_dict_object_is_not_mutated(self, samples):
+        zstd = pytest.importorskip("zstandard")
+        raw = ZstdCompressor.optimize_dict(samples)
+        data = b"".join(samples[:50])
+        expected = zstd.ZstdCompressor(level=19, dict_data=zstd.ZstdCompressionDict(raw)).compress(data)
+
+        shared = zstd.ZstdCompressionDict(raw)
+        compressor = ZstdCompressor(level=1, zstd_dict=shared)
+        assert compressor.decompress(compressor.compress(data)) == data
+        # Precomputing for level 1 in place would leak into the caller's own use.
+        assert zstd.ZstdCompressor(level=19, dict_data=shared).compress(data) == expected
+
+
+class TestCompressBatch:
+    @pytest.mark.parametrize("threads", [0, -1])
+    def test_batch_matches_single_roundtrip(self, samples, threads: int):
+        compressor = ZstdCompressor()
+        blobs = compressor.compress_batch(samples, threads=threads)
+        assert len(blobs) == len(samples)
+        assert [compressor.decompress(b) for b in blobs] == samples
+
+    def test_batch_handles_empty_inputs(self):
+        compressor = ZstdCompressor()
+        assert compressor.compress_batch([]) == []
+        blobs = compressor.compress_batch([b"", b"abc"])
+        assert [compressor.decompress(b) for b in blobs] == [b"", b"abc"]
+
+
+class TestRawThreshold:
+    def test_small_payloads_skip_compression(self):
+        compressor = ZstdCompressor(raw_threshold=64)
+        small = b"tiny value"
+        blob = compressor.compress(small)
+        assert blob == b"\x00" + small
+        assert compressor.decompress(blob) == small
+        assert compressor.decompress(compressor.compress(b"")) == b""
+
+        big = b"abc" * 100
+        assert compressor.compress(big)[:1] != b"\x00"
+        assert compressor.decompress(compressor.compress(big)) == big
+
+    def test_plain_frames_still_readable(self):
+        """Blobs written before the raw path existed are ordinary frames."""
+        legacy = ZstdCompressor().compress(b"short")
+        assert ZstdCompressor(raw_threshold=64).decompress(legacy) == b"short"
+
+    def test_dictionary_disables_raw_path(self, samples):
+        zdict = ZstdCompressor.optimize_dict(samples)
+        compressor = ZstdCompressor(zstd_dict=zdict, raw_threshold=64)
+        assert compressor.compress(samples[0])[:1] != b"\x00"
+
+    def test_batch_mixes_raw_and_frames(self, samples):
+        compressor = ZstdCompressor(raw_threshold=64)
+        data = [b"x", b"y" * 500, b"", *samples[:5]]
+        blobs = compressor.compress_batch(data, threads=-1)
+        assert blobs[0] == b"\x00x"
+        assert [compressor.decompress(b) for b in blobs] == data